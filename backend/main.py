@@ -1,18 +1,23 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import uvicorn
-import yaml
 import os
-from storage.milvus_client import MilvusClient
-from embeddings.bairen_embedder import BairenEmbedder
+from storage.milvus_client import get_milvus_client
+from embeddings.bairen_embedder import get_embedder
 from chunking.splitter import TextSplitter
 from utils.dedup import Deduplicator
 from loaders.loader_manager import DocumentLoaderManager
 from retrieval.searcher import Searcher
 from retrieval.reranker import Reranker
+from retrieval.query_batcher import QueryBatcher
+from utils.config import load_config
 import tempfile
+import shutil
+import threading
 import logging
 
 # Configure logging
@@ -20,11 +25,14 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load configuration
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
+config = load_config()
 
-app = FastAPI(title="RAG Backend API", description="Backend API for RAG system", version="1.0.0")
+app = FastAPI(
+    title="RAG Backend API",
+    description="Backend API for RAG system",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
 
 # Add CORS middleware to allow frontend requests
 app.add_middleware(
@@ -39,11 +47,15 @@ app.add_middleware(
 logger.info("Initializing RAG components...")
 loader_manager = DocumentLoaderManager()
 text_splitter = TextSplitter(config['chunking'])
-embedder = BairenEmbedder()
-milvus_client = MilvusClient()
+embedder = get_embedder()
+milvus_client = get_milvus_client()
 deduplicator = Deduplicator(config['dedup'])
 searcher = Searcher()
 reranker = Reranker()
+# Size of the pieces uploaded files are copied to disk in
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Blocking work runs in the threadpool, so concurrent uploads must not interleave dedup state updates
+dedup_lock = threading.Lock()
 logger.info("RAG components initialized successfully")
 
 class UploadResponse(BaseModel):
@@ -81,6 +93,33 @@ class DocumentCard(BaseModel):
     timestamp: int
     metadata: dict
 
+def split_and_deduplicate(documents: List[dict]) -> Tuple[int, List[dict], List[int]]:
+    """Split documents into chunks and drop duplicates, returning the total chunk count, valid chunks
+    and the content fingerprints to commit once the chunks are stored"""
+    total_chunks = 0
+    valid_chunks = []
+    fingerprints = []
+    with dedup_lock:
+        for document in documents:
+            # Split document into chunks
+            chunks = text_splitter.split(document)
+            total_chunks += len(chunks)
+            
+            # Check for duplicates, skipping content ingested in earlier runs first
+            new_chunks, new_fingerprints = deduplicator.filter_seen_content(chunks)
+            valid_chunks.extend(deduplicator.filter_new(new_chunks))
+            fingerprints.extend(new_fingerprints)
+                    
+    return total_chunks, valid_chunks, fingerprints
+
+# Concurrent query and search requests share one embedding call and one nq > 1 Milvus search
+query_batcher = QueryBatcher(
+    embed_fn=embedder.embed_queries,
+    search_fn=milvus_client.search_many,
+    max_batch_size=config['retrieval'].get('batch_max_size', 32),
+    max_wait_ms=config['retrieval'].get('batch_max_wait_ms', 5)
+)
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -97,38 +136,30 @@ async def upload_file(file: UploadFile = File(...), domain: str = "default"):
         # Save uploaded file to temporary location with correct extension
         file_extension = os.path.splitext(file.filename)[1] if file.filename else ".tmp"
         with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-            tmp_file.write(await file.read())
             tmp_file_path = tmp_file.name
+            # Stream the upload in fixed-size pieces so memory stays bounded regardless of file size
+            await run_in_threadpool(shutil.copyfileobj, file.file, tmp_file, UPLOAD_CHUNK_SIZE)
 
-        # Load document
-        documents = loader_manager.load_document(tmp_file_path, domain)
+        # Load document; blocking loader, embedding and Milvus calls run in the threadpool
+        documents = await run_in_threadpool(loader_manager.load_document, tmp_file_path, domain)
         logger.info(f"Loaded {len(documents)} documents from {file.filename}")
         
-        # Process each document
-        total_chunks = 0
-        ingested_count = 0
-        for document in documents:
-            # Split document into chunks
-            chunks = text_splitter.split(document)
-            total_chunks += len(chunks)
-            
-            # Process each chunk
-            valid_chunks = []
-            for chunk in chunks:
-                # Check for duplicates
-                if not deduplicator.is_duplicate(chunk):
-                    valid_chunks.append(chunk)
+        # Split and deduplicate chunks across all documents
+        total_chunks, valid_chunks, fingerprints = await run_in_threadpool(split_and_deduplicate, documents)
                     
-            if not valid_chunks:
-                continue
-                
-            # Generate embeddings for valid chunks
+        # Embed and store all valid chunks at once instead of one round trip per document
+        ingested_count = 0
+        if valid_chunks:
             chunk_texts = [chunk['text'] for chunk in valid_chunks]
-            embeddings = embedder.embed(chunk_texts)
+            embeddings = await run_in_threadpool(embedder.embed, chunk_texts)
             
             # Store in Milvus
-            inserted_count = milvus_client.insert(valid_chunks, embeddings)
-            ingested_count += inserted_count
+            ingested_count = await run_in_threadpool(milvus_client.insert, valid_chunks, embeddings)
+            await run_in_threadpool(milvus_client.flush)
+            
+        # Only remember content once its chunks are stored; a failed upload leaves it retryable
+        deduplicator.commit_fingerprints(fingerprints)
+        await run_in_threadpool(deduplicator.save_fingerprints)
             
         # Clean up temporary file
         os.unlink(tmp_file_path)
@@ -155,10 +186,6 @@ async def query_documents(request: SearchRequest):
     """Query documents using the full RAG pipeline"""
     logger.info(f"Query request received: {request.query}, domain: {request.domain}")
     try:
-        # Generate query embedding
-        query_embeddings = embedder.embed([request.query])
-        query_embedding = query_embeddings[0]
-        
         # Prepare timestamp filter
         timestamp_filter = {}
         if request.timestamp_start is not None:
@@ -166,9 +193,9 @@ async def query_documents(request: SearchRequest):
         if request.timestamp_end is not None:
             timestamp_filter['end'] = request.timestamp_end
         
-        # Search in Milvus with all filters
-        search_results = milvus_client.search(
-            query_embedding=query_embedding,
+        # Embed and search in Milvus with all filters, batched with concurrent requests
+        search_results = await query_batcher.search(
+            request.query,
             domain=request.domain if request.domain else None,
             source=request.source if request.source else None,
             timestamp_filter=timestamp_filter or None,
@@ -180,7 +207,7 @@ async def query_documents(request: SearchRequest):
         logger.info(f"Found {len(candidates)} candidates")
         
         # Rerank candidates
-        reranked_results = reranker.rerank(request.query, candidates)
+        reranked_results = await run_in_threadpool(reranker.rerank, request.query, candidates)
         logger.info(f"Reranked results: {len(reranked_results)} items")
         
         # Format results
@@ -206,10 +233,6 @@ async def search_documents(request: SearchRequest):
     """Direct search endpoint (simplified version for frontend compatibility)"""
     logger.info(f"Search request received: {request.query}, domain: {request.domain}")
     try:
-        # Generate query embedding
-        query_embeddings = embedder.embed([request.query])
-        query_embedding = query_embeddings[0]
-        
         # Prepare timestamp filter
         timestamp_filter = {}
         if request.timestamp_start is not None:
@@ -217,9 +240,9 @@ async def search_documents(request: SearchRequest):
         if request.timestamp_end is not None:
             timestamp_filter['end'] = request.timestamp_end
         
-        # Search in Milvus
-        results = milvus_client.search(
-            query_embedding=query_embedding,
+        # Embed and search in Milvus, batched with concurrent requests
+        results = await query_batcher.search(
+            request.query,
             domain=request.domain if request.domain else None,
             source=request.source if request.source else None,
             timestamp_filter=timestamp_filter or None,
@@ -257,27 +280,28 @@ async def get_document_cards(filter_options: FilterOptions):
             timestamp_filter['end'] = filter_options.timestamp_end
         
         # Get all documents from Milvus
-        results = milvus_client.get_all_documents(
+        results = await run_in_threadpool(
+            milvus_client.get_all_documents,
             domain=filter_options.domain if filter_options.domain else None,
             source=filter_options.source if filter_options.source else None,
             timestamp_filter=timestamp_filter or None,
             limit=1000  # Adjust limit as needed
         )
         
-        # Format results
+        # Format results as plain dicts; returning the response directly skips per-card pydantic validation
         formatted_results = []
         for result in results:
-            formatted_results.append(DocumentCard(
-                id=result.get("id", 0),
-                content=result.get("content", ""),
-                domain=result.get("domain", ""),
-                source=result.get("source", ""),
-                timestamp=result.get("timestamp", 0),
-                metadata=result.get("metadata", {})
-            ))
+            formatted_results.append({
+                "id": result.get("id", 0),
+                "content": result.get("content", ""),
+                "domain": result.get("domain", ""),
+                "source": result.get("source", ""),
+                "timestamp": result.get("timestamp", 0),
+                "metadata": result.get("metadata", {})
+            })
         
         logger.info(f"Get document cards completed successfully with {len(formatted_results)} results")
-        return formatted_results
+        return ORJSONResponse(formatted_results)
     except Exception as e:
         logger.error(f"Get document cards failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
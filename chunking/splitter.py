@@ -1,14 +1,88 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Iterable, Iterator
 import re
-import copy
+from functools import lru_cache
+import numpy as np
 from utils.tokenizer import Tokenizer
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+def _compute_spans(num_tokens: int, chunk_size: int, chunk_overlap: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute sliding window token spans in closed form.
+    
+    Windows start every ``chunk_size - chunk_overlap`` tokens and the last window is the
+    first one that reaches the end of the token sequence.
+    
+    Args:
+        num_tokens (int): Number of tokens in the text
+        chunk_size (int): Window size in tokens
+        chunk_overlap (int): Overlap between consecutive windows in tokens
+        
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Start and end token index of every window
+    """
+    stride = chunk_size - chunk_overlap
+    if stride <= 0:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+    if num_tokens == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+        
+    num_windows = max(0, -(-(num_tokens - chunk_size) // stride)) + 1
+    starts = np.arange(num_windows, dtype=np.int64) * stride
+    ends = np.minimum(starts + chunk_size, num_tokens)
+    return starts, ends
+
+# Keys are whole document texts, so only the last few are kept; re-splitting a text
+# right away still reuses its offsets without pinning large documents in memory
+@lru_cache(maxsize=4)
+def _token_offsets(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tokenize text once into token offset arrays, cached for repeated splits of the same text.
+    
+    Args:
+        text (str): Text to tokenize
+        
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Read-only uint32 start and end character offset of every token
+    """
+    token_starts, token_ends = Tokenizer.token_offsets(text)
+    offsets = np.array([token_starts, token_ends], dtype=np.uint32).reshape(2, -1)
+    # Cached arrays are shared between callers, so guard them against mutation
+    offsets.setflags(write=False)
+    return offsets[0], offsets[1]
+
+def _iter_pieces(pattern: re.Pattern, text: str) -> Iterator[str]:
+    """
+    Lazily yield the non-empty, stripped pieces of text between pattern matches.
+    
+    Equivalent to filtering ``pattern.split(text)``, without building the full list of pieces.
+    
+    Args:
+        pattern (re.Pattern): Compiled boundary pattern
+        text (str): Text to split
+        
+    Yields:
+        str: Stripped text between consecutive boundaries
+    """
+    start = 0
+    for match in pattern.finditer(text):
+        piece = text[start:match.start()].strip()
+        if piece:
+            yield piece
+        start = match.end()
+    piece = text[start:].strip()
+    if piece:
+        yield piece
+
 class TextSplitter:
     """Split text into chunks according to different strategies."""
     
+    # Precompiled boundary patterns shared by all instances
+    _SENT_RE = re.compile(r'[.!?。！？]')
+    _PARA_RE = re.compile(r'\n\s*\n')
+    
     def __init__(self, config: Dict[str, Any]):
         """
         Initialize text splitter with configuration.
@@ -20,6 +94,13 @@ class TextSplitter:
         self.strategy = config.get('strategy', 'sliding_token')
         self.chunk_size = config.get('chunk_size', 512)
         self.chunk_overlap = config.get('chunk_overlap', 64)
+        # Resolve the strategy once instead of walking an if/elif chain on every split
+        self._split_text = {
+            'sliding_token': self._sliding_token_split,
+            'sentence': self._sentence_split,
+            'paragraph': self._paragraph_split,
+            'hybrid': self._hybrid_split,
+        }.get(self.strategy)
     
     def split(self, document: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -35,25 +116,21 @@ class TextSplitter:
         if not text.strip():
             return []
             
-        if self.strategy == 'sliding_token':
-            chunks = self._sliding_token_split(text)
-        elif self.strategy == 'sentence':
-            chunks = self._sentence_split(text)
-        elif self.strategy == 'paragraph':
-            chunks = self._paragraph_split(text)
-        elif self.strategy == 'hybrid':
-            chunks = self._hybrid_split(text)
-        else:
+        if self._split_text is None:
             raise ValueError(f"Unknown splitting strategy: {self.strategy}")
+        chunks = self._split_text(text)
             
         # Create document chunks with metadata
+        # Each chunk gets its own top-level and metadata dicts; the rest is shared with the source document
+        base_metadata = document.get('metadata') or {}
+        chunk_total = len(chunks)
         document_chunks = []
         for i, chunk_text in enumerate(chunks):
-            # Deep copy the document to avoid reference issues
-            chunk_doc = copy.deepcopy(document)
-            chunk_doc['text'] = chunk_text
-            chunk_doc['metadata']['chunk_index'] = i
-            chunk_doc['metadata']['chunk_total'] = len(chunks)
+            chunk_doc = {
+                **document,
+                'text': chunk_text,
+                'metadata': {**base_metadata, 'chunk_index': i, 'chunk_total': chunk_total}
+            }
             document_chunks.append(chunk_doc)
             
         logger.info(f"Split document into {len(document_chunks)} chunks using {self.strategy} strategy")
@@ -69,22 +146,14 @@ class TextSplitter:
         Returns:
             List[str]: List of text chunks
         """
-        tokens = Tokenizer.tokenize(text)
-        chunks = []
+        token_starts, token_ends = _token_offsets(text)
+        starts, ends = _compute_spans(len(token_starts), self.chunk_size, self.chunk_overlap)
         
-        start = 0
-        while start < len(tokens):
-            end = min(start + self.chunk_size, len(tokens))
-            chunk_tokens = tokens[start:end]
-            chunk_text = ''.join(chunk_tokens)
-            chunks.append(chunk_text)
-            
-            if end == len(tokens):
-                break
-                
-            start += self.chunk_size - self.chunk_overlap
-            
-        return chunks
+        # Character span of every window by index arithmetic, then slice windows straight
+        # out of the text instead of re-joining token lists
+        char_starts = token_starts[starts].tolist()
+        char_ends = token_ends[ends - 1].tolist()
+        return [text[start:end] for start, end in zip(char_starts, char_ends)]
     
     def _sentence_split(self, text: str) -> List[str]:
         """
@@ -96,28 +165,20 @@ class TextSplitter:
         Returns:
             List[str]: List of text chunks
         """
-        # Simple sentence splitting by punctuation
-        sentences = re.split(r'[.!?。！？]', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        
-        chunks = []
-        current_chunk = ""
-        current_tokens = 0
+        return [chunk for chunk, _ in self._sentence_chunks(text)]
+    
+    def _sentence_chunks(self, text: str) -> List[Tuple[str, int]]:
+        """
+        Split text by sentences, keeping the token count of every chunk.
         
-        for sentence in sentences:
-            sentence_tokens = Tokenizer.count_tokens(sentence)
-            if current_tokens + sentence_tokens > self.chunk_size and current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = sentence
-                current_tokens = sentence_tokens
-            else:
-                current_chunk += sentence + " "
-                current_tokens += sentence_tokens
-                
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        Args:
+            text (str): Text to split
             
-        return chunks
+        Returns:
+            List[Tuple[str, int]]: Text chunks with their token counts
+        """
+        # Simple sentence splitting by punctuation, streamed so sentences are not all held at once
+        return self._merge_pieces(_iter_pieces(self._SENT_RE, text), " ")
     
     def _paragraph_split(self, text: str) -> List[str]:
         """
@@ -129,26 +190,57 @@ class TextSplitter:
         Returns:
             List[str]: List of text chunks
         """
-        # Split by double newlines (paragraphs)
-        paragraphs = re.split(r'\n\s*\n', text)
-        paragraphs = [p.strip() for p in paragraphs if p.strip()]
+        return [chunk for chunk, _ in self._paragraph_chunks(text)]
+    
+    def _paragraph_chunks(self, text: str) -> List[Tuple[str, int]]:
+        """
+        Split text by paragraphs, keeping the token count of every chunk.
         
+        Args:
+            text (str): Text to split
+            
+        Returns:
+            List[Tuple[str, int]]: Text chunks with their token counts
+        """
+        # Split by double newlines (paragraphs), streamed so paragraphs are not all held at once
+        return self._merge_pieces(_iter_pieces(self._PARA_RE, text), "\n\n")
+    
+    def _merge_pieces(self, pieces: Iterable[str], separator: str) -> List[Tuple[str, int]]:
+        """
+        Greedily merge pieces into chunks whose pieces hold at most chunk_size tokens.
+        
+        Every piece is tokenized exactly once. Pieces are stripped, and neither tokenizer
+        merges tokens across whitespace, so a merged chunk has exactly the tokens of its
+        pieces plus those of the separators and its count needs no second tokenization.
+        
+        Args:
+            pieces (Iterable[str]): Stripped, non-empty text pieces
+            separator (str): Whitespace separator placed between merged pieces
+            
+        Returns:
+            List[Tuple[str, int]]: Text chunks with their token counts
+        """
+        separator_tokens = Tokenizer.count_tokens(separator)
         chunks = []
-        current_chunk = ""
+        current_parts = []
         current_tokens = 0
         
-        for paragraph in paragraphs:
-            paragraph_tokens = Tokenizer.count_tokens(paragraph)
-            if current_tokens + paragraph_tokens > self.chunk_size and current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = paragraph
-                current_tokens = paragraph_tokens
+        def flush():
+            chunk_tokens = current_tokens + (len(current_parts) - 1) * separator_tokens
+            chunks.append((separator.join(current_parts), chunk_tokens))
+            
+        for piece in pieces:
+            piece_tokens = Tokenizer.count_tokens(piece)
+            if current_tokens + piece_tokens > self.chunk_size and current_parts:
+                flush()
+                current_parts = [piece]
+                current_tokens = piece_tokens
             else:
-                current_chunk += "\n\n" + paragraph if current_chunk else paragraph
-                current_tokens += paragraph_tokens
+                current_parts.append(piece)
+                current_tokens += piece_tokens
                 
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        if current_parts:
+            flush()
             
         return chunks
     
@@ -162,41 +254,40 @@ class TextSplitter:
         Returns:
             List[str]: List of text chunks
         """
-        # First split by paragraphs
-        paragraphs = self._paragraph_split(text)
-        
+        # Token counts travel with the chunks, so paragraphs and sentences are tokenized
+        # only once instead of again whenever a merged chunk is checked against the limit
         chunks = []
-        for paragraph in paragraphs:
-            if Tokenizer.count_tokens(paragraph) > self.chunk_size:
+        for paragraph, paragraph_tokens in self._paragraph_chunks(text):
+            if paragraph_tokens > self.chunk_size:
                 # If paragraph is still too long, split by sentences
-                sentence_chunks = self._sentence_split(paragraph)
-                for sentence_chunk in sentence_chunks:
-                    if Tokenizer.count_tokens(sentence_chunk) > self.chunk_size:
+                for sentence_chunk, sentence_tokens in self._sentence_chunks(paragraph):
+                    if sentence_tokens > self.chunk_size:
                         # If sentence is still too long, use sliding token split
-                        token_chunks = self._sliding_token_split(sentence_chunk)
-                        chunks.extend(token_chunks)
+                        chunks.extend(
+                            (token_chunk, Tokenizer.count_tokens(token_chunk))
+                            for token_chunk in self._sliding_token_split(sentence_chunk)
+                        )
                     else:
-                        chunks.append(sentence_chunk)
+                        chunks.append((sentence_chunk, sentence_tokens))
             else:
-                chunks.append(paragraph)
+                chunks.append((paragraph, paragraph_tokens))
                 
         # Merge small chunks to optimize size
         merged_chunks = []
-        current_chunk = ""
+        current_parts = []
         current_tokens = 0
         
-        for chunk in chunks:
-            chunk_tokens = Tokenizer.count_tokens(chunk)
+        for chunk, chunk_tokens in chunks:
             if current_tokens + chunk_tokens <= self.chunk_size:
-                current_chunk += "\n\n" + chunk if current_chunk else chunk
+                current_parts.append(chunk)
                 current_tokens += chunk_tokens
             else:
-                if current_chunk:
-                    merged_chunks.append(current_chunk)
-                current_chunk = chunk
+                if current_parts:
+                    merged_chunks.append("\n\n".join(current_parts))
+                current_parts = [chunk]
                 current_tokens = chunk_tokens
                 
-        if current_chunk:
-            merged_chunks.append(current_chunk)
+        if current_parts:
+            merged_chunks.append("\n\n".join(current_parts))
             
         return merged_chunks
\ No newline at end of file
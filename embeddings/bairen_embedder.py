@@ -1,31 +1,60 @@
+import base64
 import time
+import threading
 import numpy as np
-from typing import List, Dict, Any
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Union
 import requests
-import yaml
-import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.config import load_config
+from utils.query_cache import QueryCache
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-# Load configuration
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
-
 class BairenEmbedder:
     """Aliyun Bailian Embedding API client for text embedding."""
     
-    def __init__(self):
-        """Initialize the embedder with configuration."""
-        self.api_key = config['embedding']['api_key']
-        self.model_name = config['embedding']['model_name']
-        self.batch_size = config['embedding']['batch_size']
-        self.timeout = config['embedding']['timeout']
-        self.max_retries = config['embedding']['max_retries']
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize the embedder with configuration.
+        
+        Args:
+            config (Dict[str, Any]): Embedding configuration
+        """
+        self.api_key = config['api_key']
+        self.model_name = config['model_name']
+        self.batch_size = config['batch_size']
+        self.timeout = config['timeout']
+        self.max_retries = config['max_retries']
+        # Maximum number of batches sent to the API concurrently
+        self.concurrency = config.get('concurrency', 8)
+        # Optional response encoding, e.g. "base64" for packed float32 vectors where the
+        # model supports it; None keeps the default JSON float lists
+        self.encoding_format = config.get('encoding_format')
         # API endpoint for multimodal embedding
-        self.api_url = "https://dashscope.aliyuncs.com/api/v1/services/embeddings/multimodal-embedding/multimodal-embedding"    
-    def embed(self, texts: List[str]) -> List[List[float]]:
+        self.api_url = "https://dashscope.aliyuncs.com/api/v1/services/embeddings/multimodal-embedding/multimodal-embedding"
+        # Shared session so concurrent batches reuse pooled keep-alive TLS connections
+        self._session = requests.Session()
+        pool_size = max(self.concurrency, 1)
+        # Retry a failed connection setup once right away; failed requests themselves are
+        # retried with backoff by _embed_batch_with_retry, so reads are not retried here
+        connection_retries = Retry(total=1, read=0, backoff_factor=0)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=connection_retries)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        # Long-lived pool for concurrent batches; threads are started on demand and reused
+        # across embed calls instead of being spawned per call
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="embed")
+        # Query embeddings shared between requests, so repeated queries skip the API
+        self.query_cache = QueryCache(
+            max_size=config.get('query_cache_size', 1024),
+            ttl_seconds=config.get('query_cache_ttl_seconds')
+        )
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for a list of texts.
         
@@ -33,23 +62,62 @@ class BairenEmbedder:
             texts (List[str]): List of texts to embed
             
         Returns:
-            List[List[float]]: List of embeddings
+            np.ndarray: L2 normalized float32 embeddings of shape (len(texts), dim)
         """
-        all_embeddings = []
+        # Process in batches, dispatching them concurrently since each call is I/O bound
+        batches = [texts[i:i+self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1 or self.concurrency <= 1:
+            results = [self._embed_batch_with_retry(batch) for batch in batches]
+        else:
+            # map preserves input order, so embeddings stay aligned with texts
+            results = list(self._executor.map(self._embed_batch_with_retry, batches))
+            
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+            
+        # Copy every batch straight into one contiguous (N, D) matrix
+        dim = len(results[0][0])
+        matrix = np.empty((len(texts), dim), dtype=np.float32)
+        offset = 0
+        for embeddings in results:
+            matrix[offset:offset + len(embeddings)] = embeddings
+            offset += len(embeddings)
+        if offset != len(texts):
+            raise RuntimeError(f"Expected {len(texts)} embeddings, got {offset}")
+            
+        # Normalize embeddings in place, keeping them as one contiguous array for downstream consumers
+        return self._l2_normalize_batch(matrix)
+    
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for queries, serving repeated queries from the query cache.
         
-        # Process in batches
-        for i in range(0, len(texts), self.batch_size):
-            batch_texts = texts[i:i+self.batch_size]
-            print(f"Processing batch of {len(batch_texts)} texts")
-            embeddings = self._embed_batch_with_retry(batch_texts)
-            all_embeddings.extend(embeddings)
-            print(f"ALL_Embedding dimension: {len(all_embeddings[0])}")
+        Args:
+            queries (List[str]): List of query texts
             
-        # Normalize embeddings
-        normalized_embeddings = [self._l2_normalize(emb) for emb in all_embeddings]
-        return normalized_embeddings
+        Returns:
+            np.ndarray: L2 normalized float32 embeddings of shape (len(queries), dim)
+        """
+        found = {}
+        for query in queries:
+            if query not in found:
+                embedding = self.query_cache.get(query)
+                if embedding is not None:
+                    found[query] = embedding
+        
+        # Embed all cache misses in one call
+        missing = [query for query in dict.fromkeys(queries) if query not in found]
+        if missing:
+            embeddings = self.embed(missing)
+            # Cached vectors are shared between callers, so guard them against mutation
+            embeddings.setflags(write=False)
+            for query, embedding in zip(missing, embeddings):
+                found[query] = embedding
+                self.query_cache.put(query, embedding)
+        
+        return np.stack([found[query] for query in queries])
     
-    def _embed_batch_with_retry(self, texts: List[str]) -> List[List[float]]:
+    def _embed_batch_with_retry(self, texts: List[str]) -> List[Union[np.ndarray, List[float]]]:
         """
         Generate embeddings for a batch of texts with retry logic.
         
@@ -57,7 +125,7 @@ class BairenEmbedder:
             texts (List[str]): List of texts to embed
             
         Returns:
-            List[List[float]]: List of embeddings
+            List[Union[np.ndarray, List[float]]]: List of embeddings
         """
         for attempt in range(self.max_retries):
             try:
@@ -75,7 +143,7 @@ class BairenEmbedder:
         # This should never be reached
         raise RuntimeError("Unexpected error in retry loop")
     
-    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+    def _embed_batch(self, texts: List[str]) -> List[Union[np.ndarray, List[float]]]:
         """
         Generate embeddings for a batch of texts.
         
@@ -83,7 +151,8 @@ class BairenEmbedder:
             texts (List[str]): List of texts to embed
             
         Returns:
-            List[List[float]]: List of embeddings
+            List[Union[np.ndarray, List[float]]]: List of embeddings, as float32 arrays when
+                the API returned them base64 encoded
         """
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -102,8 +171,10 @@ class BairenEmbedder:
                 "contents": contents
             }
         }
+        if self.encoding_format:
+            payload["parameters"] = {"encoding_format": self.encoding_format}
         
-        response = requests.post(
+        response = self._session.post(
             self.api_url,
             headers=headers,
             json=payload,
@@ -113,18 +184,49 @@ class BairenEmbedder:
         if response.status_code != 200:
             raise RuntimeError(f"API request failed with status {response.status_code}: {response.text}")
             
-        result = response.json()
+        # orjson parses the thousands of float literals per batch far faster than json
+        result = orjson.loads(response.content)
         if "output" not in result or "embeddings" not in result["output"]:
             raise RuntimeError(f"Invalid API response: {result}")
             
         # Sort embeddings by index to ensure correct order
         embeddings_data = sorted(result["output"]["embeddings"], key=lambda x: x["index"])
-        embeddings = [item["embedding"] for item in embeddings_data]
-        print(f"Embeddings generated successfully for {len(embeddings)} texts")
-        print(f"Embedding dimension: {len(embeddings[0])}")
+        embeddings = [self._decode_embedding(item["embedding"]) for item in embeddings_data]
+        logger.debug("Embedded batch of %d texts, dimension %d", len(embeddings), len(embeddings[0]) if embeddings else 0)
         return embeddings
     
-    def _l2_normalize(self, vector: List[float]) -> List[float]:
+    @staticmethod
+    def _decode_embedding(embedding: Union[str, List[float]]) -> Union[np.ndarray, List[float]]:
+        """
+        Decode a base64 packed float32 embedding; JSON float lists are returned unchanged.
+        
+        Args:
+            embedding (Union[str, List[float]]): Embedding as returned by the API
+            
+        Returns:
+            Union[np.ndarray, List[float]]: Embedding values
+        """
+        if isinstance(embedding, str):
+            return np.frombuffer(base64.b64decode(embedding), dtype=np.float32)
+        return embedding
+    
+    def _l2_normalize_batch(self, vectors: Union[np.ndarray, List[List[float]]]) -> np.ndarray:
+        """
+        L2 normalize a batch of vectors in a single NumPy operation.
+        
+        Args:
+            vectors (Union[np.ndarray, List[List[float]]]): Vectors to normalize, a float32
+                array is normalized in place
+            
+        Returns:
+            np.ndarray: Normalized vectors of shape (N, D); zero vectors are left unchanged
+        """
+        arr = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(arr, axis=1, keepdims=True)
+        np.divide(arr, norms, out=arr, where=norms != 0)
+        return arr
+    
+    def _l2_normalize(self, vector: List[float]) -> np.ndarray:
         """
         L2 normalize a vector.
         
@@ -132,9 +234,28 @@ class BairenEmbedder:
             vector (List[float]): Vector to normalize
             
         Returns:
-            List[float]: Normalized vector
+            np.ndarray: Normalized float32 vector; a zero vector is returned unchanged
         """
-        norm = np.linalg.norm(vector)
-        if norm == 0:
-            return vector
-        return [v / norm for v in vector]
\ No newline at end of file
+        arr = np.array(vector, dtype=np.float32)
+        norm = np.linalg.norm(arr)
+        if norm:
+            arr /= norm
+        return arr
+
+# Process-wide embedder shared by every component
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def get_embedder() -> BairenEmbedder:
+    """
+    Get the shared embedder, creating it from the embedding config on first use.
+    
+    Returns:
+        BairenEmbedder: Process-wide embedder
+    """
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = BairenEmbedder(load_config()['embedding'])
+    return _embedder
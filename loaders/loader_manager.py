@@ -1,6 +1,8 @@
+import mmap
 import os
 import uuid
-from typing import List, Dict, Any, Union
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Union
 from pathlib import Path
 
 from langchain_community.document_loaders import (
@@ -9,22 +11,66 @@ from langchain_community.document_loaders import (
     Docx2txtLoader,
     UnstructuredHTMLLoader
 )
+from langchain_core.documents import Document
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Text files at least this large are decoded straight from a memory map
+MMAP_THRESHOLD_BYTES = 10 * 1024 * 1024
+
+class _MmapTextLoader:
+    """UTF-8 text loader that decodes a file from a read-only memory map."""
+    
+    def __init__(self, path: str):
+        """
+        Initialize the loader.
+        
+        Args:
+            path (str): Path to the text file
+        """
+        self.path = path
+    
+    def load(self) -> List[Document]:
+        """
+        Load the file as a single document, with the same metadata as TextLoader.
+        
+        Returns:
+            List[Document]: Loaded document
+        """
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, 'madvise'):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                # Decode from the page cache without copying the file into a bytes object first
+                text = str(mm, 'utf-8')
+        return [Document(page_content=text, metadata={'source': self.path})]
+
+def _text_loader(path: str) -> Union[TextLoader, _MmapTextLoader]:
+    """Create a UTF-8 text loader, memory mapping large files."""
+    if os.path.getsize(path) >= MMAP_THRESHOLD_BYTES:
+        return _MmapTextLoader(path)
+    return TextLoader(path, encoding='utf-8')
+
 class DocumentLoaderManager:
     """Manage loading documents from various sources and formats."""
     
-    def __init__(self):
-        """Initialize the document loader manager."""
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Initialize the document loader manager.
+        
+        Args:
+            max_workers (Optional[int]): Worker processes used by load_directory, defaults to the CPU count
+        """
+        # Factories are module-level callables so the manager can be pickled into worker processes
         self.loader_mapping = {
-            '.txt': lambda path: TextLoader(path, encoding='utf-8'),
-            '.pdf': lambda path: PyPDFLoader(path),
+            '.txt': _text_loader,
+            '.pdf': PyPDFLoader,
             '.docx': Docx2txtLoader,
             '.html': UnstructuredHTMLLoader,
             '.htm': UnstructuredHTMLLoader,
         }
+        self.max_workers = max_workers
     
     def load_document(self, file_path: Union[str, Path], domain: str = "") -> List[Dict[str, Any]]:
         """
@@ -50,10 +96,12 @@ class DocumentLoaderManager:
             loader = loader_factory(str(file_path))
             documents = loader.load()
             
+            # One random prefix per file plus a page counter keeps ids unique without a uuid per page
+            id_prefix = uuid.uuid4().hex[:16]
             standardized_docs = []
-            for doc in documents:
+            for i, doc in enumerate(documents):
                 standardized_doc = {
-                    "id": str(uuid.uuid4()),
+                    "id": f"{id_prefix}{i:08x}",
                     "domain": domain,
                     "source": str(file_path.absolute()),
                     "text": doc.page_content,
@@ -85,16 +133,28 @@ class DocumentLoaderManager:
         if not directory_path.exists():
             raise FileNotFoundError(f"Directory not found: {directory_path}")
             
-        documents = []
         pattern = "**/*" if recursive else "*"
+        file_paths = [
+            file_path for file_path in directory_path.glob(pattern)
+            if file_path.is_file() and file_path.suffix.lower() in self.loader_mapping
+        ]
         
-        for file_path in directory_path.glob(pattern):
-            if file_path.is_file() and file_path.suffix.lower() in self.loader_mapping:
+        documents = []
+        if len(file_paths) <= 1 or self.max_workers == 1:
+            for file_path in file_paths:
                 try:
-                    docs = self.load_document(file_path, domain)
-                    documents.extend(docs)
+                    documents.extend(self.load_document(file_path, domain))
                 except Exception as e:
                     logger.warning(f"Skipping file {file_path} due to error: {str(e)}")
+        else:
+            # Parsing (PDF in particular) is CPU bound, so spread files across processes
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(self.load_document, file_path, domain) for file_path in file_paths]
+                for file_path, future in zip(file_paths, futures):
+                    try:
+                        documents.extend(future.result())
+                    except Exception as e:
+                        logger.warning(f"Skipping file {file_path} due to error: {str(e)}")
                     
         logger.info(f"Loaded {len(documents)} documents from directory {directory_path}")
         return documents
\ No newline at end of file
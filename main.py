@@ -1,23 +1,24 @@
 import argparse
-import yaml
 import os
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from typing import List, Dict, Any, Tuple
 from loaders.loader_manager import DocumentLoaderManager
 from chunking.splitter import TextSplitter
-from embeddings.bairen_embedder import BairenEmbedder
-from storage.milvus_client import MilvusClient
+from embeddings.bairen_embedder import get_embedder
+from storage.milvus_client import get_milvus_client
 from retrieval.searcher import Searcher
 from retrieval.reranker import Reranker
 from utils.dedup import Deduplicator
 from utils.llm_processor import LLMProcessor
+from utils.config import load_config
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 # Load configuration
-config_path = os.path.join(os.path.dirname(__file__), 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
+config = load_config()
 
 class RAGEngine:
     """RAG Engine encapsulating the full pipeline."""
@@ -26,12 +27,18 @@ class RAGEngine:
         """Initialize RAG engine components."""
         self.loader_manager = DocumentLoaderManager()
         self.text_splitter = TextSplitter(config['chunking'])
-        self.embedder = BairenEmbedder()
-        self.milvus_client = MilvusClient()
+        self.embedder = get_embedder()
+        self.milvus_client = get_milvus_client()
         self.searcher = Searcher()
         self.reranker = Reranker()
         self.deduplicator = Deduplicator(config['dedup'])
         self.llm_processor = LLMProcessor()
+        # Number of valid chunks collected before they are embedded and inserted together
+        self.ingest_batch_size = config.get('ingest', {}).get('batch_size', 4096)
+        # Number of documents split and processed concurrently
+        self.ingest_workers = config.get('ingest', {}).get('workers') or os.cpu_count()
+        # Number of Milvus insert requests allowed in flight during ingestion
+        self.max_pending_inserts = config.get('ingest', {}).get('max_pending_inserts', 4)
         
         logger.info("RAG Engine initialized")
     
@@ -53,36 +60,123 @@ class RAGEngine:
         else:
             raise ValueError(f"Path is neither a file nor a directory: {path}")
             
-        # Process each document
+        # Collect valid chunks across documents and embed them in large batches
         ingested_count = 0
-        for document in documents:
-            # Split document into chunks
-            chunks = self.text_splitter.split(document)
-            
-            # Use LLM to process chunks
-            processed_chunks = self.llm_processor.process_chunks(chunks)
+        pending_chunks = []
+        # Content fingerprints of the documents behind pending_chunks
+        pending_fingerprints = []
+        # Inserts still in flight, so embedding the next batch overlaps with writing the previous one
+        pending_inserts = deque()
+        try:
+            # Splitting and LLM processing are independent per document and mostly wait on the
+            # LLM API, so they run concurrently; dedup keeps shared state and stays on this thread
+            with ThreadPoolExecutor(max_workers=self.ingest_workers) as executor:
+                futures = [executor.submit(self._prepare_chunks, document) for document in documents]
+                for future in as_completed(futures):
+                    chunks, fingerprints = future.result()
+                    # Check for duplicates
+                    pending_chunks.extend(self.deduplicator.filter_new(chunks))
+                    pending_fingerprints.extend(fingerprints)
+                
+                    if len(pending_chunks) >= self.ingest_batch_size:
+                        ingested_count += self._embed_and_insert(pending_chunks, pending_fingerprints, pending_inserts)
+                        pending_chunks = []
+                        pending_fingerprints = []
+                
+            if pending_chunks or pending_fingerprints:
+                ingested_count += self._embed_and_insert(pending_chunks, pending_fingerprints, pending_inserts)
+                
+            # Wait for the remaining inserts
+            while pending_inserts:
+                ingested_count += self._complete_insert(pending_inserts.popleft())
+        finally:
+            # Flush once per run, even if ingestion was interrupted
+            self.milvus_client.flush()
+            # Persist only fingerprints whose chunks were stored
+            self.deduplicator.save_fingerprints()
             
-            # Process each chunk
-            chunk_embeddings = []
-            valid_chunks = []
+        logger.info(f"Ingestion completed. {ingested_count} chunks ingested.")
+    
+    def _prepare_chunks(self, document: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        Split a document and process its chunks with the LLM.
+        
+        Args:
+            document (Dict[str, Any]): Document to prepare
             
-            for chunk in processed_chunks:
-                # Check for duplicates
-                if not self.deduplicator.is_duplicate(chunk):
-                    valid_chunks.append(chunk)
-                    
-            if not valid_chunks:
-                continue
-                
-            # Generate embeddings for valid chunks
-            chunk_texts = [chunk['text'] for chunk in valid_chunks]
-            embeddings = self.embedder.embed(chunk_texts)
+        Returns:
+            Tuple[List[Dict[str, Any]], List[int]]: Processed chunks and the content
+                fingerprints to commit once they are stored
+        """
+        # Split document into chunks
+        chunks = self.text_splitter.split(document)
+        
+        # Skip chunks ingested before, so repeats never reach the LLM
+        chunks, fingerprints = self.deduplicator.filter_seen_content(chunks)
+        
+        # Use LLM to process chunks
+        return self.llm_processor.process_chunks(chunks), fingerprints
+    
+    def _embed_and_insert(self, chunks: List[Dict[str, Any]], fingerprints: List[int],
+                          pending_inserts: deque) -> int:
+        """
+        Embed chunks in one call and send them to Milvus without waiting for the write.
+        
+        At most ingest.max_pending_inserts writes are in flight at once: after each send the
+        oldest writes are awaited until there is room for the next. The content fingerprints
+        ride on the batch's last write and are committed only once it completes.
+        
+        Args:
+            chunks (List[Dict[str, Any]]): Chunks to store
+            fingerprints (List[int]): Content fingerprints of the documents behind chunks
+            pending_inserts (deque): (insert future, fingerprints) pairs still in flight, oldest first
             
-            # Store in Milvus
-            inserted_count = self.milvus_client.insert(valid_chunks, embeddings)
-            ingested_count += inserted_count
+        Returns:
+            int: Number of chunks whose insert completed while making room
+        """
+        if not chunks:
+            # Nothing to store, so the content counts as ingested right away
+            self.deduplicator.commit_fingerprints(fingerprints)
+            return 0
+        
+        # Embed texts in length order so each API batch holds similarly sized inputs,
+        # then scatter the embeddings back to the original chunk order
+        chunk_texts = [chunk['text'] for chunk in chunks]
+        order = np.argsort([len(text) for text in chunk_texts], kind='stable')
+        sorted_embeddings = self.embedder.embed([chunk_texts[i] for i in order])
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        
+        # Store in Milvus
+        inserted_count = 0
+        # insert_async sends each request only when its future is taken, so making room
+        # right after a send keeps the next one within the limit
+        for future in self.milvus_client.insert_async(chunks, embeddings):
+            pending_inserts.append((future, []))
+            while len(pending_inserts) >= self.max_pending_inserts:
+                inserted_count += self._complete_insert(pending_inserts.popleft())
+        # The batch's last write carries its fingerprints; with a limit of 1 it is already done
+        if pending_inserts:
+            future, _ = pending_inserts[-1]
+            pending_inserts[-1] = (future, fingerprints)
+        else:
+            self.deduplicator.commit_fingerprints(fingerprints)
+        return inserted_count
+    
+    def _complete_insert(self, pending_insert: Tuple[Any, List[int]]) -> int:
+        """
+        Wait for an in-flight insert and commit the fingerprints riding on it.
+        
+        Args:
+            pending_insert (Tuple[Any, List[int]]): Insert future and its fingerprints
             
-        logger.info(f"Ingestion completed. {ingested_count} chunks ingested.")
+        Returns:
+            int: Number of chunks the insert stored
+        """
+        future, fingerprints = pending_insert
+        inserted_count = len(future.result().primary_keys)
+        self.deduplicator.commit_fingerprints(fingerprints)
+        return inserted_count
     
     def query(self, q: str, domain: str = None) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,144 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class QueryBatcher:
+    """Coalesce concurrent queries into one embedding call and one multi-query search."""
+
+    def __init__(self, embed_fn: Callable[[List[str]], np.ndarray],
+                 search_fn: Callable[..., List[List[Dict[str, Any]]]],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Initialize query batcher.
+
+        Args:
+            embed_fn (Callable[[List[str]], np.ndarray]): Embeds a list of queries
+            search_fn (Callable[..., List[List[Dict[str, Any]]]]): Multi-query search,
+                e.g. MilvusClient.search_many
+            max_batch_size (int): Flush as soon as this many queries are pending
+            max_wait_ms (float): Maximum time a query waits for others to join its batch
+        """
+        self.embed_fn = embed_fn
+        self.search_fn = search_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []
+        self._flush_handle = None
+        # Keep references to running batches so they are not garbage collected
+        self._tasks = set()
+
+    async def search(self, query: str, domain: Optional[str] = None, limit: int = 10,
+                     source: Optional[str] = None,
+                     timestamp_filter: Optional[dict] = None) -> List[Dict[str, Any]]:
+        """
+        Search for documents similar to the query, batched with concurrent callers.
+
+        Args:
+            query (str): Query text
+            domain (Optional[str]): Domain filter
+            limit (int): Maximum number of results
+            source (Optional[str]): Source filter
+            timestamp_filter (Optional[dict]): Timestamp filter with keys 'start' and/or 'end'
+
+        Returns:
+            List[Dict[str, Any]]: Search results
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        filters = {
+            'domain': domain,
+            'limit': limit,
+            'source': source,
+            'timestamp_filter': timestamp_filter,
+        }
+        self._pending.append((query, filters, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Hand the pending queries to a background batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, Dict[str, Any], asyncio.Future]]):
+        """
+        Run one batch off the event loop and resolve its futures.
+
+        Args:
+            batch (List[Tuple[str, Dict[str, Any], asyncio.Future]]): Pending queries
+        """
+        try:
+            results = await asyncio.to_thread(self._process, [(query, filters) for query, filters, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _process(self, batch: List[Tuple[str, Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Embed all queries at once and run one search per distinct filter set.
+
+        Args:
+            batch (List[Tuple[str, Dict[str, Any]]]): Queries with their filters
+
+        Returns:
+            List[List[Dict[str, Any]]]: Search results for each query, in input order
+        """
+        embeddings = np.asarray(self.embed_fn([query for query, _ in batch]))
+
+        # Only queries with identical filters and limit can share a search request
+        groups = {}
+        for i, (_, filters) in enumerate(batch):
+            groups.setdefault(self._group_key(filters), []).append(i)
+
+        results = [None] * len(batch)
+        for indices in groups.values():
+            filters = batch[indices[0]][1]
+            group_results = self.search_fn(embeddings[indices], **filters)
+            for i, result in zip(indices, group_results):
+                results[i] = result
+
+        logger.debug(f"Batched {len(batch)} queries into {len(groups)} searches")
+        return results
+
+    @staticmethod
+    def _group_key(filters: Dict[str, Any]) -> tuple:
+        """
+        Build a hashable key identifying queries that can be searched together.
+
+        Args:
+            filters (Dict[str, Any]): Search filters and limit
+
+        Returns:
+            tuple: Grouping key
+        """
+        timestamp_filter = filters['timestamp_filter']
+        return (
+            filters['domain'],
+            filters['limit'],
+            filters['source'],
+            tuple(sorted(timestamp_filter.items())) if timestamp_filter else None,
+        )
@@ -1,32 +1,39 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from utils.bm25 import bm25_score
+from utils.config import load_config
 from utils.logger import get_logger
-import yaml
-import os
+from utils.tokenizer import Tokenizer
 
 logger = get_logger(__name__)
 
-# Load configuration
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
-
 class Reranker:
     """Re-ranker for search results."""
     
-    def __init__(self):
-        """Initialize reranker with configuration."""
-        self.mode = config['reranker']['mode']
-        self.weights = config['reranker']['weights']
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize reranker with configuration.
+        
+        Args:
+            config (Optional[Dict[str, Any]]): Reranker configuration, defaults to the
+                reranker section of config.yaml
+        """
+        if config is None:
+            config = load_config()['reranker']
+        self.mode = config['mode']
+        self.weights = config['weights']
+        # Number of best candidates returned, None returns all of them
+        self.top_k = config.get('top_k')
     
-    def rerank(self, query: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def rerank(self, query: str, candidates: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Rerank search candidates.
         
         Args:
             query (str): Query text
             candidates (List[Dict[str, Any]]): Search candidates
+            top_k (Optional[int]): Number of best candidates to return, defaults to
+                reranker.top_k from the config and to all candidates if that is unset
             
         Returns:
             List[Dict[str, Any]]: Reranked candidates
@@ -38,91 +45,112 @@ class Reranker:
             # For simplicity, we'll simulate cross-encoder scoring with BM25
             # In a real implementation, you would use a cross-encoder model
             logger.warning("Cross-encoder mode simulated with BM25 scoring")
-            reranked = self._bm25_rerank(query, candidates)
+            final_scores = self._bm25_rerank(query, candidates)
         elif self.mode == 'embedding_bm25_mixed':
-            reranked = self._mixed_rerank(query, candidates)
+            final_scores = self._mixed_rerank(query, candidates)
         else:
             raise ValueError(f"Unknown reranker mode: {self.mode}")
             
-        # Sort by final score
-        reranked.sort(key=lambda x: x['final_score'], reverse=True)
+        # Sort by final score; a stable sort on negated scores keeps ties in retrieval order
+        top_k = self.top_k if top_k is None else top_k
+        negated_scores = -final_scores
+        if top_k is not None and top_k < len(candidates):
+            # Select the best top_k in linear time and sort only those
+            top = np.argpartition(negated_scores, max(top_k - 1, 0))[:max(top_k, 0)]
+            top.sort()
+            order = top[np.argsort(negated_scores[top], kind='stable')]
+        else:
+            order = np.argsort(negated_scores, kind='stable')
+        reranked = [candidates[i] for i in order]
         logger.info(f"Reranked {len(reranked)} candidates")
         return reranked
     
-    def _bm25_rerank(self, query: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _bm25_scores(self, query: str, candidates: List[Dict[str, Any]]) -> np.ndarray:
         """
-        Rerank using BM25 scoring.
+        Calculate BM25 scores of candidates for the query.
         
         Args:
             query (str): Query text
             candidates (List[Dict[str, Any]]): Search candidates
             
         Returns:
-            List[Dict[str, Any]]: BM25 reranked candidates
+            np.ndarray: BM25 score of every candidate
         """
-        # Extract candidate texts
-        texts = [c['content'] for c in candidates]
-        
-        # Fit TF-IDF on candidates + query
-        all_texts = texts + [query]
-        vectorizer = TfidfVectorizer()
-        tfidf_matrix = vectorizer.fit_transform(all_texts)
-        
-        # Calculate cosine similarity between query and candidates
-        query_vector = tfidf_matrix[-1]
-        candidate_vectors = tfidf_matrix[:-1]
+        # Score candidates directly, with statistics taken from the candidate set
+        return bm25_score(
+            self._tokenize(query),
+            [self._tokenize(c['content']) for c in candidates]
+        )
+    
+    def _bm25_rerank(self, query: str, candidates: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Rerank using BM25 scoring, storing scores on the candidates in place.
         
-        # Calculate BM25-like scores
-        scores = np.asarray(candidate_vectors.multiply(query_vector).sum(axis=1)).flatten()
+        Args:
+            query (str): Query text
+            candidates (List[Dict[str, Any]]): Search candidates
+            
+        Returns:
+            np.ndarray: Final score of every candidate
+        """
+        scores = self._bm25_scores(query, candidates)
         
         # Add scores to candidates
-        reranked = []
-        for i, candidate in enumerate(candidates):
-            candidate_copy = candidate.copy()
-            candidate_copy['bm25_score'] = float(scores[i])
-            candidate_copy['final_score'] = float(scores[i])
-            reranked.append(candidate_copy)
+        for candidate, score in zip(candidates, scores.tolist()):
+            candidate['bm25_score'] = score
+            candidate['final_score'] = score
             
-        return reranked
+        return scores
     
-    def _mixed_rerank(self, query: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _mixed_rerank(self, query: str, candidates: List[Dict[str, Any]]) -> np.ndarray:
         """
-        Rerank using mixed ANN and BM25 scores.
+        Rerank using mixed ANN and BM25 scores, storing scores on the candidates in place.
         
         Args:
             query (str): Query text
             candidates (List[Dict[str, Any]]): Search candidates
             
         Returns:
-            List[Dict[str, Any]]: Mixed reranked candidates
+            np.ndarray: Final score of every candidate
         """
-        # Normalize ANN scores (distances)
-        ann_scores = np.array([c.get('distance', 0) for c in candidates])
-        # Assuming distances are in [0, 1] range, higher is better (for IP metric)
-        # If using L2 metric, you might need to convert differently
-        normalized_ann_scores = ann_scores  # Already in appropriate range for IP
+        # ANN scores (distances)
+        # Milvus stores unit-length vectors under the IP metric, so distances are
+        # cosine similarities in [-1, 1], higher is better
+        ann_scores = np.fromiter((c.get('distance', 0) for c in candidates), dtype=np.float64, count=len(candidates))
         
         # Calculate BM25 scores
-        bm25_reranked = self._bm25_rerank(query, candidates)
-        bm25_scores = np.array([c['bm25_score'] for c in bm25_reranked])
+        bm25_scores = self._bm25_scores(query, candidates)
         
         # Normalize BM25 scores to [0, 1]
-        if bm25_scores.max() != bm25_scores.min():
-            normalized_bm25_scores = (bm25_scores - bm25_scores.min()) / (bm25_scores.max() - bm25_scores.min())
-        else:
-            normalized_bm25_scores = np.zeros_like(bm25_scores)
+        bm25_min = bm25_scores.min()
+        bm25_range = bm25_scores.max() - bm25_min
+        normalized_bm25_scores = np.subtract(bm25_scores, bm25_min)
+        if bm25_range:
+            np.divide(normalized_bm25_scores, bm25_range, out=normalized_bm25_scores)
         
         # Combine scores
         w_ann = self.weights.get('ann', 0.7)
         w_bm25 = self.weights.get('bm25', 0.3)
         
-        final_scores = w_ann * normalized_ann_scores + w_bm25 * normalized_bm25_scores
+        final_scores = np.multiply(ann_scores, w_ann, out=ann_scores)
+        final_scores += w_bm25 * normalized_bm25_scores
         
-        # Add final scores to candidates
-        reranked = []
-        for i, candidate in enumerate(bm25_reranked):
-            candidate_copy = candidate.copy()
-            candidate_copy['final_score'] = float(final_scores[i])
-            reranked.append(candidate_copy)
+        # Add scores to candidates
+        for candidate, bm25, final in zip(candidates, bm25_scores.tolist(), final_scores.tolist()):
+            candidate['bm25_score'] = bm25
+            candidate['final_score'] = final
             
-        return reranked
\ No newline at end of file
+        return final_scores
+    
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        """
+        Tokenize text for BM25 scoring.
+        
+        Args:
+            text (str): Text to tokenize
+            
+        Returns:
+            List[str]: Lowercased tokens without whitespace
+        """
+        return [token.lower() for token in Tokenizer.tokenize(text) if token.strip()]
@@ -1,26 +1,34 @@
 from typing import List, Dict, Any, Optional
-from embeddings.bairen_embedder import BairenEmbedder
-from storage.milvus_client import MilvusClient
+import numpy as np
+from embeddings.bairen_embedder import get_embedder
+from storage.milvus_client import get_milvus_client
+from utils.config import load_config
 from utils.logger import get_logger
-import yaml
-import os
+from utils.query_cache import QueryCache
 
 logger = get_logger(__name__)
 
-# Load configuration
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
-
 class Searcher:
     """Document searcher using vector similarity."""
     
-    def __init__(self):
-        """Initialize searcher with embedder and Milvus client."""
-        self.embedder = BairenEmbedder()
-        self.milvus_client = MilvusClient()
-        self.top_k = config['retrieval']['top_k']
-        self.domain_filter = config['retrieval']['domain_filter']
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize searcher with the shared embedder and Milvus client.
+        
+        Args:
+            config (Optional[Dict[str, Any]]): Retrieval configuration, defaults to the
+                retrieval section of config.yaml
+        """
+        if config is None:
+            config = load_config()['retrieval']
+        self.embedder = get_embedder()
+        self.milvus_client = get_milvus_client()
+        self.top_k = config['top_k']
+        self.domain_filter = config['domain_filter']
+        self.cache = QueryCache(
+            max_size=config.get('cache_size', 1024),
+            ttl_seconds=config.get('cache_ttl_seconds', 300)
+        )
     
     def search(self, query: str, domain: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -33,20 +41,100 @@ class Searcher:
         Returns:
             List[Dict[str, Any]]: Search results
         """
-        # Generate query embedding
-        query_embedding = self.embedder.embed([query])[0]
+        domain = domain if self.domain_filter else None
+        # Including the collection version means any insert invalidates cached results
+        key = (query.strip().lower(), domain, self.top_k, self.milvus_client.collection_version)
+        results = self.cache.get(key)
+        if results is not None:
+            logger.info(f"Retrieved {len(results)} candidates from cache")
+            return self._copy_hits(results)
+        
+        # Generate query embedding, repeated queries come from the embedder's query cache
+        query_embedding = self.embedder.embed_queries([query])[0]
         logger.info("Generated query embedding")
         
         # Search in Milvus
         results = self.milvus_client.search(
             query_embedding=query_embedding,
-            domain=domain if self.domain_filter else None,
+            domain=domain,
             limit=self.top_k
         )
+        self.cache.put(key, results)
         
         logger.info(f"Retrieved {len(results)} candidates")
+        return self._copy_hits(results)
+    
+    def batch_search(self, queries: List[str], domains: Optional[List[Optional[str]]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for documents similar to several queries at once.
+        
+        Uncached queries are embedded in one call and searched with one multi-query
+        Milvus request per distinct domain.
+        
+        Args:
+            queries (List[str]): Query texts
+            domains (Optional[List[Optional[str]]]): Domain filter of every query
+            
+        Returns:
+            List[List[Dict[str, Any]]]: Search results for each query, in input order
+        """
+        if domains is None:
+            domains = [None] * len(queries)
+        if len(domains) != len(queries):
+            raise ValueError("Number of domains must match number of queries")
+            
+        version = self.milvus_client.collection_version
+        keys = []
+        results = [None] * len(queries)
+        missing = []
+        for i, (query, domain) in enumerate(zip(queries, domains)):
+            domain = domain if self.domain_filter else None
+            key = (query.strip().lower(), domain, self.top_k, version)
+            keys.append(key)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[i] = self._copy_hits(cached)
+            else:
+                missing.append(i)
+                
+        if missing:
+            # Generate query embeddings in one call
+            embeddings = np.asarray(self.embedder.embed_queries([queries[i] for i in missing]))
+            logger.info(f"Generated {len(missing)} query embeddings")
+            
+            # Queries with the same domain share one Milvus request
+            groups = {}
+            for row, i in enumerate(missing):
+                groups.setdefault(keys[i][1], []).append((row, i))
+            for domain, members in groups.items():
+                group_results = self.milvus_client.search_many(
+                    embeddings[[row for row, _ in members]],
+                    domain=domain,
+                    limit=self.top_k
+                )
+                for (_, i), query_results in zip(members, group_results):
+                    self.cache.put(keys[i], query_results)
+                    results[i] = self._copy_hits(query_results)
+                    
+        logger.info(f"Retrieved candidates for {len(queries)} queries")
         return results
     
+    @staticmethod
+    def _copy_hits(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Copy the hit dicts of cached results for one caller.
+        
+        The reranker writes its scores into the hits, so handing out the cached dicts
+        would let concurrent requests for the same query overwrite each other's scores.
+        
+        Args:
+            results (List[Dict[str, Any]]): Cached search results
+            
+        Returns:
+            List[Dict[str, Any]]: Shallow copies of the hits
+        """
+        return [dict(result) for result in results]
+    
     def format_results_for_reranking(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Format search results for reranking.
@@ -1,7 +1,8 @@
 import json
-from typing import List, Dict, Any, Optional
-import yaml
-import os
+from typing import List, Dict, Any, Iterator, Optional, Union
+import threading
+from functools import lru_cache
+import numpy as np
 from pymilvus import (
     connections,
     Collection,
@@ -10,21 +11,80 @@ from pymilvus import (
     DataType,
     utility
 )
+from utils.config import load_config
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-# Load configuration
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
+def _escape(value: str) -> str:
+    """
+    Escape a value for use inside a single-quoted Milvus string literal.
+    
+    Args:
+        value (str): Raw value
+        
+    Returns:
+        str: Escaped value
+    """
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+@lru_cache(maxsize=256)
+def _build_expr(domain: Optional[str], source: Optional[str],
+                timestamp_start: Optional[int], timestamp_end: Optional[int]) -> Optional[str]:
+    """
+    Build a boolean filter expression, reusing the string for repeated filters.
+    
+    Args:
+        domain (Optional[str]): Domain filter
+        source (Optional[str]): Source filter
+        timestamp_start (Optional[int]): Minimum timestamp
+        timestamp_end (Optional[int]): Maximum timestamp
+        
+    Returns:
+        Optional[str]: Filter expression, or None without filters
+    """
+    filters = []
+    if domain:
+        filters.append(f"domain == '{_escape(domain)}'")
+    if source:
+        filters.append(f"source == '{_escape(source)}'")
+    if timestamp_start is not None:
+        filters.append(f"timestamp >= {int(timestamp_start)}")
+    if timestamp_end is not None:
+        filters.append(f"timestamp <= {int(timestamp_end)}")
+    return " and ".join(filters) or None
 
 class MilvusClient:
     """Milvus client for vector storage and retrieval."""
     
-    def __init__(self):
-        """Initialize Milvus client and connect to the server."""
-        milvus_config = config['milvus']
+    # NumPy dtype expected by Milvus for each supported vector field type
+    VECTOR_DTYPES = {
+        'FLOAT_VECTOR': np.float32,
+        'FLOAT16_VECTOR': np.float16,
+    }
+    
+    # Search parameters used when none are configured, per index type
+    DEFAULT_SEARCH_PARAMS = {
+        'HNSW': {'ef': 64},
+        'IVF_FLAT': {'nprobe': 16},
+        'IVF_SQ8': {'nprobe': 16},
+        'IVF_PQ': {'nprobe': 16},
+    }
+    
+    def __init__(self, index_params: Optional[Dict[str, Any]] = None,
+                 search_params: Optional[Dict[str, Any]] = None):
+        """
+        Initialize Milvus client and connect to the server.
+        
+        Args:
+            index_params (Optional[Dict[str, Any]]): Index build parameters,
+                defaults to milvus.index_params from the config
+            search_params (Optional[Dict[str, Any]]): Index-specific search
+                parameters (e.g. ef for HNSW, nprobe for IVF), defaults to
+                milvus.search_params from the config, then to the defaults
+                of the collection's index type
+        """
+        milvus_config = load_config()['milvus']
         
         # Connect to Milvus
         connections.connect(
@@ -37,10 +97,30 @@ class MilvusClient:
         
         self.collection_name = milvus_config['collection_name']
         self.dim = milvus_config['dim']
-        self.index_params = milvus_config['index_params']
+        self.index_params = index_params or milvus_config['index_params']
+        # Vectors are stored unit-length, so inner product is the cosine similarity
+        if self.index_params.get('metric_type') != 'IP':
+            raise ValueError(f"Unsupported metric type: {self.index_params.get('metric_type')}, expected IP")
+        # Maximum number of rows sent to Milvus per insert request
+        self.insert_batch = milvus_config.get('insert_batch', 1000)
+        # Vector field type used when creating a new collection
+        self.vector_type = milvus_config.get('vector_type', 'FLOAT_VECTOR')
+        if self.vector_type not in self.VECTOR_DTYPES:
+            raise ValueError(f"Unsupported vector type: {self.vector_type}")
         
         # Initialize collection
         self.collection = self._get_or_create_collection()
+        # Existing collections keep the precision they were created with
+        self.vector_dtype = self._get_vector_dtype(self.collection)
+        # Existing collections also keep the index they were created with, which the
+        # default search parameters must match
+        self.search_params = (
+            search_params
+            or milvus_config.get('search_params')
+            or self.DEFAULT_SEARCH_PARAMS.get(self._get_index_type(self.collection), {})
+        )
+        # Bumped on every insert so caches keyed on it drop stale search results
+        self.collection_version = 0
         logger.info(f"Connected to Milvus collection: {self.collection_name}")
     
     def _get_or_create_collection(self) -> Collection:
@@ -110,7 +190,7 @@ class MilvusClient:
             ),
             FieldSchema(
                 name="embedding",
-                dtype=DataType.FLOAT_VECTOR,
+                dtype=getattr(DataType, self.vector_type),
                 dim=self.dim
             ),
             FieldSchema(
@@ -127,6 +207,89 @@ class MilvusClient:
         
         return schema
     
+    def _get_vector_dtype(self, collection: Collection) -> type:
+        """
+        Get the NumPy dtype matching the collection's embedding field.
+        
+        Args:
+            collection (Collection): Milvus collection instance
+            
+        Returns:
+            type: NumPy dtype vectors must be cast to before insert and search
+        """
+        for field in collection.schema.fields:
+            if field.name == "embedding" and field.dtype == DataType.FLOAT16_VECTOR:
+                return np.float16
+        return np.float32
+    
+    def _get_index_type(self, collection: Collection) -> Optional[str]:
+        """
+        Get the index type of the collection's embedding field.
+        
+        Args:
+            collection (Collection): Milvus collection instance
+            
+        Returns:
+            Optional[str]: Index type such as HNSW or IVF_FLAT, the configured one if no index is found
+        """
+        for index in collection.indexes:
+            if index.field_name == "embedding":
+                return index.params.get('index_type')
+        return self.index_params.get('index_type')
+    
+    def _to_vectors(self, embeddings: Union[np.ndarray, List[List[float]]]) -> np.ndarray:
+        """
+        Normalize embeddings to unit length and cast them to the collection's vector precision.
+        
+        With unit-length vectors on both sides, the IP metric is cosine similarity.
+        
+        Args:
+            embeddings (Union[np.ndarray, List[List[float]]]): Embeddings to convert
+            
+        Returns:
+            np.ndarray: Unit-length embeddings with the collection's vector dtype
+        """
+        # Copy so the caller's embeddings are left untouched
+        vectors = np.array(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        vectors /= np.maximum(norms, 1e-12)
+        return vectors.astype(self.vector_dtype, copy=False)
+    
+    @staticmethod
+    def _filter_expr(domain: Optional[str], source: Optional[str],
+                     timestamp_filter: Optional[dict]) -> Optional[str]:
+        """
+        Get the filter expression for the given filters.
+        
+        Args:
+            domain (Optional[str]): Domain filter
+            source (Optional[str]): Source filter
+            timestamp_filter (Optional[dict]): Timestamp filter with keys 'start' and/or 'end'
+            
+        Returns:
+            Optional[str]: Filter expression, or None without filters
+        """
+        if not (domain or source or timestamp_filter):
+            return None
+        timestamp_filter = timestamp_filter or {}
+        return _build_expr(domain, source, timestamp_filter.get('start'), timestamp_filter.get('end'))
+    
+    @staticmethod
+    def _parse_metadata(metadata: Any) -> Dict[str, Any]:
+        """
+        Get metadata as a dict from a JSON field value.
+        
+        Args:
+            metadata (Any): Value read from the metadata field
+            
+        Returns:
+            Dict[str, Any]: Metadata dict
+        """
+        # Rows inserted before metadata was stored natively hold a serialized JSON string
+        if isinstance(metadata, str):
+            return json.loads(metadata or "{}")
+        return metadata or {}
+    
     def _create_index(self, collection: Collection):
         """
         Create index for the collection.
@@ -141,17 +304,42 @@ class MilvusClient:
         )
         logger.info("Created index for collection")
     
-    def insert(self, documents: List[Dict[str, Any]], embeddings: List[List[float]]) -> int:
+    def insert(self, documents: List[Dict[str, Any]], embeddings: Union[np.ndarray, List[List[float]]]) -> int:
         """
         Insert documents with embeddings into the collection.
         
         Args:
             documents (List[Dict[str, Any]]): Documents to insert
-            embeddings (List[List[float]]): Corresponding embeddings
+            embeddings (Union[np.ndarray, List[List[float]]]): Corresponding embeddings, an (N, dim)
+                array is forwarded to Milvus without conversion
             
         Returns:
             int: Number of inserted entities
         """
+        # Send every request before waiting, so the writes run concurrently
+        futures = list(self.insert_async(documents, embeddings))
+        inserted_count = sum(len(future.result().primary_keys) for future in futures)
+        # Searches that ran while the writes were in flight may have cached pre-insert results
+        self.collection_version += 1
+        
+        logger.info(f"Inserted {inserted_count} entities into collection")
+        return inserted_count
+    
+    def insert_async(self, documents: List[Dict[str, Any]], embeddings: Union[np.ndarray, List[List[float]]]) -> Iterator[Any]:
+        """
+        Send documents with embeddings to the collection without waiting for the writes.
+        
+        Requests are sent lazily, one per future taken from the generator, so callers can
+        wait for earlier writes before the next one starts.
+        
+        Args:
+            documents (List[Dict[str, Any]]): Documents to insert
+            embeddings (Union[np.ndarray, List[List[float]]]): Corresponding embeddings, an (N, dim)
+                array is forwarded to Milvus without conversion
+            
+        Returns:
+            Iterator[Any]: One MutationFuture per insert request, whose result() is the MutationResult
+        """
         if len(documents) != len(embeddings):
             raise ValueError("Number of documents must match number of embeddings")
             
@@ -160,32 +348,35 @@ class MilvusClient:
         contents = [doc.get('text', '') for doc in documents]
         sources = [doc.get('source', '') for doc in documents]
         timestamps = [doc.get('timestamp', 0) for doc in documents]
-        metadata_list = [json.dumps(doc.get('metadata', {})) for doc in documents]
-        
-        # Insert data
-        entities = [
-            domains,
-            contents,
-            sources,
-            timestamps,
-            embeddings,
-            metadata_list
-        ]
+        # The metadata field is a native JSON field, so dicts are stored as they are
+        metadata_list = [doc.get('metadata') or {} for doc in documents]
+        vectors = self._to_vectors(embeddings)
         
-        result = self.collection.insert(entities)
-        self.collection.flush()
-        
-        logger.info(f"Inserted {len(result.primary_keys)} entities into collection")
-        return len(result.primary_keys)
+        # Insert data in bounded batches; sealing segments is left to flush()
+        for start in range(0, len(documents), self.insert_batch):
+            end = start + self.insert_batch
+            entities = [
+                domains[start:end],
+                contents[start:end],
+                sources[start:end],
+                timestamps[start:end],
+                list(vectors[start:end]),
+                metadata_list[start:end]
+            ]
+            future = self.collection.insert(entities, _async=True)
+            # Invalidates results cached before the insert; results cached while the writes are
+            # still in flight are invalidated again by insert() or flush() once they complete
+            self.collection_version += 1
+            yield future
     
-    def search(self, query_embedding: List[float], domain: Optional[str] = None, 
+    def search(self, query_embedding: Union[np.ndarray, List[float]], domain: Optional[str] = None, 
                limit: int = 10, source: Optional[str] = None, 
                timestamp_filter: Optional[dict] = None) -> List[Dict[str, Any]]:
         """
         Search for similar documents.
         
         Args:
-            query_embedding (List[float]): Query embedding
+            query_embedding (Union[np.ndarray, List[float]]): Query embedding
             domain (Optional[str]): Domain filter
             limit (int): Maximum number of results
             source (Optional[str]): Source filter
@@ -194,29 +385,45 @@ class MilvusClient:
         Returns:
             List[Dict[str, Any]]: Search results
         """
+        return self.search_many(
+            [query_embedding],
+            domain=domain,
+            limit=limit,
+            source=source,
+            timestamp_filter=timestamp_filter
+        )[0]
+    
+    def search_many(self, query_embeddings: Union[np.ndarray, List[List[float]]], domain: Optional[str] = None, 
+                    limit: int = 10, source: Optional[str] = None, 
+                    timestamp_filter: Optional[dict] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar documents for several queries in one request.
+        
+        All queries share the same filters and limit, so Milvus can answer them
+        as a single nq > 1 search.
+        
+        Args:
+            query_embeddings (Union[np.ndarray, List[List[float]]]): Query embeddings
+            domain (Optional[str]): Domain filter
+            limit (int): Maximum number of results per query
+            source (Optional[str]): Source filter
+            timestamp_filter (Optional[dict]): Timestamp filter with keys 'start' and/or 'end'
+            
+        Returns:
+            List[List[Dict[str, Any]]]: Search results for each query, in input order
+        """
         # Prepare search parameters
         search_params = {
             "metric_type": self.index_params["metric_type"],
-            "params": self.index_params["params"]
+            "params": self.search_params
         }
         
         # Prepare filter expression
-        filters = []
-        if domain:
-            filters.append(f"domain == '{domain}'")
-        if source:
-            filters.append(f"source == '{source}'")
-        if timestamp_filter:
-            if 'start' in timestamp_filter:
-                filters.append(f"timestamp >= {timestamp_filter['start']}")
-            if 'end' in timestamp_filter:
-                filters.append(f"timestamp <= {timestamp_filter['end']}")
-        
-        expr = " and ".join(filters) if filters else None
+        expr = self._filter_expr(domain, source, timestamp_filter)
         
         # Perform search
         results = self.collection.search(
-            data=[query_embedding],
+            data=list(self._to_vectors(query_embeddings)),
             anns_field="embedding",
             param=search_params,
             limit=limit,
@@ -227,6 +434,7 @@ class MilvusClient:
         # Process results
         processed_results = []
         for hits in results:
+            query_results = []
             for hit in hits:
                 result = {
                     "id": hit.id,
@@ -235,11 +443,13 @@ class MilvusClient:
                     "content": hit.entity.get("content"),
                     "source": hit.entity.get("source"),
                     "timestamp": hit.entity.get("timestamp"),
-                    "metadata": json.loads(hit.entity.get("metadata") or "{}")
+                    "metadata": self._parse_metadata(hit.entity.get("metadata"))
                 }
-                processed_results.append(result)
+                query_results.append(result)
+            processed_results.append(query_results)
                 
-        logger.info(f"Search returned {len(processed_results)} results")
+        logger.info(f"Search for {len(processed_results)} queries returned "
+                    f"{sum(len(r) for r in processed_results)} results")
         return processed_results
     
     def get_all_documents(self, domain: Optional[str] = None, source: Optional[str] = None, 
@@ -257,18 +467,7 @@ class MilvusClient:
             List[Dict[str, Any]]: All documents matching the filters
         """
         # Prepare filter expression
-        filters = []
-        if domain:
-            filters.append(f"domain == '{domain}'")
-        if source:
-            filters.append(f"source == '{source}'")
-        if timestamp_filter:
-            if 'start' in timestamp_filter:
-                filters.append(f"timestamp >= {timestamp_filter['start']}")
-            if 'end' in timestamp_filter:
-                filters.append(f"timestamp <= {timestamp_filter['end']}")
-        
-        expr = " and ".join(filters) if filters else None
+        expr = self._filter_expr(domain, source, timestamp_filter)
         
         # Query all documents
         results = self.collection.query(
@@ -286,14 +485,39 @@ class MilvusClient:
                 "content": result.get("content"),
                 "source": result.get("source"),
                 "timestamp": result.get("timestamp"),
-                "metadata": json.loads(result.get("metadata") or "{}")
+                "metadata": self._parse_metadata(result.get("metadata"))
             }
             processed_results.append(processed_result)
                 
         logger.info(f"Get all documents returned {len(processed_results)} results")
         return processed_results
     
+    def flush(self):
+        """Seal pending inserts into persisted segments, once at the end of an ingestion run."""
+        self.collection.flush()
+        # Async inserts are complete now, drop anything cached while they were in flight
+        self.collection_version += 1
+        logger.info("Flushed collection")
+    
     def close(self):
         """Close the connection to Milvus."""
         connections.disconnect("default")
-        logger.info("Disconnected from Milvus")
\ No newline at end of file
+        logger.info("Disconnected from Milvus")
+
+# Process-wide client shared by every component
+_client = None
+_client_lock = threading.Lock()
+
+def get_milvus_client() -> MilvusClient:
+    """
+    Get the shared Milvus client, connecting on first use.
+    
+    Returns:
+        MilvusClient: Process-wide Milvus client
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MilvusClient()
+    return _client
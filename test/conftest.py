@@ -0,0 +1,39 @@
+import pytest
+
+@pytest.fixture(scope="session")
+def test_config():
+    """Configuration shared by the unit tests, passed to the modules directly.
+
+    The dict lives for the whole session, so tests must copy a section before changing it.
+    """
+    return {
+        'chunking': {
+            'strategy': 'sliding_token',
+            'chunk_size': 128,
+            'chunk_overlap': 32
+        },
+        'dedup': {
+            'strategy': 'md5',
+            'md5_threshold': 1.0,
+            'simhash_threshold': 3,
+            'embedding_threshold': 0.95
+        },
+        'embedding': {
+            'api_key': 'test_api_key',
+            'model_name': 'test_model',
+            'batch_size': 2,
+            'timeout': 30,
+            'max_retries': 3
+        },
+        'retrieval': {
+            'top_k': 5,
+            'domain_filter': True
+        },
+        'reranker': {
+            'mode': 'embedding_bm25_mixed',
+            'weights': {
+                'ann': 0.7,
+                'bm25': 0.3
+            }
+        }
+    }
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+# Add the project root to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import math
+from utils.bm25 import bm25_score
+
+def test_bm25_score():
+    """Test BM25 scoring against a hand-computed value"""
+    docs = [["人工智能", "是", "科学"], ["机器", "学习"], ["人工智能", "人工智能"]]
+    scores = bm25_score(["人工智能"], docs, k1=1.5, b=0.75)
+    
+    assert scores.shape == (3,)
+    assert scores[1] == 0.0
+    # Repeated matching terms score higher than a single match
+    assert scores[2] > scores[0] > 0
+    
+    idf = math.log((3 - 2 + 0.5) / (2 + 0.5) + 1)
+    avg_len = 7 / 3
+    expected = idf * 1 * 2.5 / (1 + 1.5 * (1 - 0.75 + 0.75 * 3 / avg_len))
+    assert abs(scores[0] - expected) < 1e-9
+
+def test_bm25_score_empty():
+    """Test BM25 scoring without documents or matching terms"""
+    assert len(bm25_score(["查询"], [])) == 0
+    assert bm25_score(["查询"], [[], ["文档"]]).tolist() == [0.0, 0.0]
+
+if __name__ == "__main__":
+    test_bm25_score()
+    test_bm25_score_empty()
+    print("All BM25 tests passed!")
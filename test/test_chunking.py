@@ -5,33 +5,11 @@ from pathlib import Path
 # Add the project root to the path so we can import the modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import yaml
-from chunking.splitter import TextSplitter
+import numpy as np
+import pytest
+from chunking.splitter import TextSplitter, _compute_spans, _iter_pieces, _token_offsets
 
-# Create a temporary config for testing
-test_config = {
-    'chunking': {
-        'strategy': 'sliding_token',
-        'chunk_size': 128,
-        'chunk_overlap': 32
-    },
-    'dedup': {
-        'strategy': 'md5',
-        'md5_threshold': 1.0,
-        'simhash_threshold': 3,
-        'embedding_threshold': 0.95
-    }
-}
-
-# Write test config to a temporary file
-config_path = Path(__file__).parent.parent / 'config.yaml'
-original_config_exists = config_path.exists()
-
-if not original_config_exists:
-    with open(config_path, 'w') as f:
-        yaml.dump(test_config, f)
-
-def test_sliding_token_split():
+def test_sliding_token_split(test_config):
     """Test sliding token splitting strategy"""
     splitter = TextSplitter(test_config['chunking'])
     
@@ -48,7 +26,7 @@ def test_sliding_token_split():
     assert all('text' in chunk for chunk in chunks)
     assert all(len(chunk['text']) > 0 for chunk in chunks)
 
-def test_sentence_split():
+def test_sentence_split(test_config):
     """Test sentence splitting strategy"""
     config = test_config['chunking'].copy()
     config['strategy'] = 'sentence'
@@ -67,7 +45,7 @@ def test_sentence_split():
     assert len(chunks) > 0
     assert all('text' in chunk for chunk in chunks)
 
-def test_paragraph_split():
+def test_paragraph_split(test_config):
     """Test paragraph splitting strategy"""
     config = test_config['chunking'].copy()
     config['strategy'] = 'paragraph'
@@ -85,7 +63,7 @@ def test_paragraph_split():
     assert len(chunks) > 0
     assert all('text' in chunk for chunk in chunks)
 
-def test_hybrid_split():
+def test_hybrid_split(test_config):
     """Test hybrid splitting strategy"""
     config = test_config['chunking'].copy()
     config['strategy'] = 'hybrid'
@@ -105,13 +83,65 @@ def test_hybrid_split():
     assert len(chunks) > 0
     assert all('text' in chunk for chunk in chunks)
 
-# Clean up temporary config file if it didn't exist before
-if not original_config_exists and config_path.exists():
-    config_path.unlink()
+def test_split_does_not_mutate_document(test_config):
+    """Test that chunk metadata is independent of the source document"""
+    splitter = TextSplitter(test_config['chunking'])
+    
+    document = {
+        'text': ' '.join(['word'] * 200),
+        'domain': 'test',
+        'metadata': {'author': 'tester'}
+    }
+    
+    chunks = splitter.split(document)
+    
+    assert len(chunks) > 1
+    assert document['metadata'] == {'author': 'tester'}
+    assert [chunk['metadata']['chunk_index'] for chunk in chunks] == list(range(len(chunks)))
+    assert all(chunk['metadata']['chunk_total'] == len(chunks) for chunk in chunks)
+    assert all(chunk['metadata']['author'] == 'tester' for chunk in chunks)
+    assert all(chunk['domain'] == 'test' for chunk in chunks)
+
+def test_compute_spans():
+    """Test sliding window span computation"""
+    starts, ends = _compute_spans(10, 4, 1)
+    assert list(zip(starts.tolist(), ends.tolist())) == [(0, 4), (3, 7), (6, 10)]
+    
+    starts, ends = _compute_spans(3, 4, 1)
+    assert list(zip(starts.tolist(), ends.tolist())) == [(0, 3)]
+    
+    starts, ends = _compute_spans(0, 4, 1)
+    assert len(starts) == 0 and len(ends) == 0
+    
+    with pytest.raises(ValueError):
+        _compute_spans(10, 4, 4)
+
+def test_token_offsets_cached(test_config):
+    """Test that splitting the same text with different sizes tokenizes it only once"""
+    text = "这是一个用于测试分词缓存的句子。" * 20
+    _token_offsets.cache_clear()
+    for chunk_size, chunk_overlap in [(16, 4), (32, 8), (64, 16)]:
+        config = dict(test_config['chunking'], chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        chunks = TextSplitter(config).split({'text': text})
+        assert chunks[0]['text'] and text.endswith(chunks[-1]['text'])
+    
+    info = _token_offsets.cache_info()
+    assert info.misses == 1 and info.hits == 2
+    starts, ends = _token_offsets(text)
+    assert starts.dtype == np.uint32 and not starts.flags.writeable
+    
+    # Only the last few texts stay cached, large documents are not pinned in memory
+    for i in range(10):
+        _token_offsets(f"{text}{i}")
+    assert _token_offsets.cache_info().currsize <= 4
+
+def test_iter_pieces_matches_split():
+    """Test that streamed pieces match filtering the eager re.split result"""
+    pattern = TextSplitter._SENT_RE
+    for text in ["", "。", "第一句。第二句！ 第三句", "One. Two?  Three!\n", "  no boundary  "]:
+        expected = [p.strip() for p in pattern.split(text) if p.strip()]
+        assert list(_iter_pieces(pattern, text)) == expected
 
 if __name__ == "__main__":
-    test_sliding_token_split()
-    test_sentence_split()
-    test_paragraph_split()
-    test_hybrid_split()
-    print("All chunking tests passed!")
\ No newline at end of file
+    # Run through pytest so the shared fixtures in conftest.py are available
+    sys.exit(pytest.main([__file__, "-v"]))
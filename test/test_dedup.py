@@ -5,31 +5,17 @@ from pathlib import Path
 # Add the project root to the path so we can import the modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import yaml
+import numpy as np
+import pytest
+from unittest.mock import patch
+from simhash import Simhash
 from utils.dedup import Deduplicator
 
-# Create a temporary config for testing
-test_config = {
-    'dedup': {
-        'strategy': 'md5',
-        'md5_threshold': 1.0,
-        'simhash_threshold': 3,
-        'embedding_threshold': 0.95
-    }
-}
-
-# Write test config to a temporary file
-config_path = Path(__file__).parent.parent / 'config.yaml'
-original_config_exists = config_path.exists()
-
-if not original_config_exists:
-    with open(config_path, 'w') as f:
-        yaml.dump(test_config, f)
-
-def test_md5_dedup():
-    """Test MD5 deduplication"""
+@pytest.mark.parametrize("strategy", ['md5', 'xxh3', 'sha256'])
+def test_hash_dedup(strategy, test_config):
+    """Test exact hash deduplication"""
     config = test_config['dedup'].copy()
-    config['strategy'] = 'md5'
+    config['strategy'] = strategy
     deduplicator = Deduplicator(config)
     
     doc1 = {'text': 'This is a test document'}
@@ -45,7 +31,35 @@ def test_md5_dedup():
     # Third document with different content should not be duplicate
     assert not deduplicator.is_duplicate(doc3)
 
-def test_embedding_dedup():
+def test_hash_digest_types(test_config):
+    """Test that each exact strategy stores compact digests of the expected type"""
+    expected_types = {'md5': bytes, 'xxh3': int, 'sha256': bytes}
+    for strategy, digest_type in expected_types.items():
+        config = test_config['dedup'].copy()
+        config['strategy'] = strategy
+        deduplicator = Deduplicator(config)
+        deduplicator.is_duplicate({'text': 'This is a test document'})
+        
+        _, seen_hashes = deduplicator._exact_hasher()
+        assert len(seen_hashes) == 1
+        assert all(isinstance(h, digest_type) for h in seen_hashes)
+        
+    # The md5 strategy stores 128-bit digests under seen_hashes, with seen_md5s as an alias
+    deduplicator = Deduplicator(dict(test_config['dedup'], strategy='md5'))
+    deduplicator.is_duplicate({'text': 'This is a test document'})
+    assert deduplicator.seen_md5s is deduplicator.seen_hashes
+    assert all(len(h) == 16 for h in deduplicator.seen_hashes)
+
+@pytest.mark.parametrize("strategy", ['md5', 'xxh3', 'sha256', 'md5+simhash'])
+def test_hash_dedup_shared_digests(strategy, test_config):
+    """Test that is_duplicate and filter_new record the same digests"""
+    deduplicator = Deduplicator(dict(test_config['dedup'], strategy=strategy))
+    text = '稳定币是一种加密货币'
+    
+    assert not deduplicator.is_duplicate({'text': text})
+    assert deduplicator.filter_new([{'text': text}]) == []
+
+def test_embedding_dedup(test_config):
     """Test embedding deduplication"""
     config = test_config['dedup'].copy()
     config['strategy'] = 'embedding'
@@ -64,11 +78,224 @@ def test_embedding_dedup():
     # Third embedding different from first should not be duplicate
     assert not deduplicator.is_duplicate({'text': 'doc3'}, emb3)
 
-# Clean up temporary config file if it didn't exist before
-if not original_config_exists and config_path.exists():
-    config_path.unlink()
+def test_embedding_dedup_quantized(test_config):
+    """Test that seen embeddings are stored as int8 and keep cosine similarity accurate"""
+    config = test_config['dedup'].copy()
+    config['strategy'] = 'embedding'
+    deduplicator = Deduplicator(config)
+    
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((20, 64)).astype(np.float32)
+    for i, vector in enumerate(vectors):
+        assert not deduplicator.is_duplicate({'text': f'doc{i}'}, vector)
+    assert deduplicator.seen_embedding_codes.dtype == np.int8
+    assert deduplicator.seen_embedding_codes.shape == (20, 64)
+    
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    dequantized = deduplicator.seen_embedding_codes * deduplicator.seen_embedding_scales[:, np.newaxis]
+    np.testing.assert_allclose(dequantized @ normalized[0], normalized @ normalized[0], atol=1e-2)
+    
+    # A slightly perturbed copy of a seen vector is still detected
+    assert deduplicator.is_duplicate({'text': 'near copy'}, vectors[3] + 0.01)
+
+def test_embedding_dedup_buffer_growth(test_config, monkeypatch):
+    """Test that the seen embedding buffer grows without losing rows"""
+    monkeypatch.setattr(Deduplicator, 'INITIAL_EMBEDDING_CAPACITY', 2)
+    config = dict(test_config['dedup'], strategy='embedding')
+    deduplicator = Deduplicator(config)
+    
+    vectors = np.eye(5, dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        assert not deduplicator.is_duplicate({'text': f'doc{i}'}, vector)
+    assert len(deduplicator._embedding_buffer) == 8
+    assert deduplicator.seen_embedding_codes.shape == (5, 5)
+    for i, vector in enumerate(vectors):
+        assert deduplicator.is_duplicate({'text': f'copy{i}'}, vector)
+
+def test_embedding_dedup_blocked_scan(test_config, monkeypatch):
+    """Test that the flat scan finds duplicates in every block"""
+    monkeypatch.setattr(Deduplicator, 'EMBEDDING_SCAN_BLOCK_BYTES', 3 * 8)
+    deduplicator = Deduplicator(dict(test_config['dedup'], strategy='embedding'))
+    
+    vectors = np.eye(8, dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        assert not deduplicator.is_duplicate({'text': f'doc{i}'}, vector)
+    for i, vector in enumerate(vectors):
+        assert deduplicator.is_duplicate({'text': f'copy{i}'}, vector)
+
+def test_embedding_dedup_memmap_store(tmp_path, test_config, monkeypatch):
+    """Test that a file-backed embedding store grows in place and keeps every row"""
+    monkeypatch.setattr(Deduplicator, 'INITIAL_EMBEDDING_CAPACITY', 2)
+    config = dict(test_config['dedup'], strategy='embedding', embedding_scratch_dir=str(tmp_path))
+    deduplicator = Deduplicator(config)
+    
+    vectors = np.eye(5, dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        assert not deduplicator.is_duplicate({'text': f'doc{i}'}, vector)
+    assert isinstance(deduplicator._embedding_buffer, np.memmap)
+    store_files = list(tmp_path.iterdir())
+    assert len(store_files) == 1 and store_files[0].stat().st_size == 8 * 5
+    
+    # A second instance in the same directory gets its own file and leaves the first intact
+    other = Deduplicator(config)
+    assert not other.is_duplicate({'text': 'other'}, vectors[0])
+    assert len(list(tmp_path.iterdir())) == 2
+    for i, vector in enumerate(vectors):
+        assert deduplicator.is_duplicate({'text': f'copy{i}'}, vector)
+
+def test_embedding_dedup_hnsw(test_config):
+    """Test embedding deduplication with the FAISS HNSW index"""
+    pytest.importorskip("faiss")
+    config = dict(test_config['dedup'], strategy='embedding', embedding_index='hnsw')
+    deduplicator = Deduplicator(config)
+    
+    assert not deduplicator.is_duplicate({'text': 'doc1'}, [1.0, 0.0, 0.0])
+    assert deduplicator.is_duplicate({'text': 'doc2'}, [0.99, 0.0, 0.0])
+    assert not deduplicator.is_duplicate({'text': 'doc3'}, [0.0, 1.0, 0.0])
+    assert deduplicator.hnsw_index.ntotal == 2
+
+def test_embedding_dedup_auto_index(test_config):
+    """Test that the auto index scans first and moves to HNSW without losing seen vectors"""
+    pytest.importorskip("faiss")
+    config = dict(test_config['dedup'], strategy='embedding', embedding_index='auto', hnsw_min_vectors=3)
+    deduplicator = Deduplicator(config)
+    
+    vectors = np.eye(6, dtype=np.float32)
+    for i, vector in enumerate(vectors[:3]):
+        assert not deduplicator.is_duplicate({'text': f'doc{i}'}, vector)
+    assert deduplicator.hnsw_index is None
+    
+    # The next lookup moves the scanned vectors into the graph
+    assert deduplicator.is_duplicate({'text': 'copy0'}, vectors[0])
+    assert deduplicator.hnsw_index.ntotal == 3
+    assert deduplicator.seen_embedding_codes is None
+    for i, vector in enumerate(vectors[3:]):
+        assert not deduplicator.is_duplicate({'text': f'doc{i + 3}'}, vector)
+    for vector in vectors:
+        assert deduplicator.is_duplicate({'text': 'copy'}, vector)
+    assert deduplicator.hnsw_index.ntotal == 6
+
+@pytest.mark.parametrize("strategy", ['md5', 'xxh3', 'sha256', 'simhash', 'md5+simhash'])
+def test_filter_new(strategy, test_config):
+    """Test batch deduplication"""
+    config = test_config['dedup'].copy()
+    config['strategy'] = strategy
+    deduplicator = Deduplicator(config)
+    
+    docs = [
+        {'text': 'This is a test document'},
+        {'text': 'This is a test document'},  # Duplicate within the batch
+        {'text': 'A completely different piece of content about stablecoins'}
+    ]
+    
+    assert deduplicator.filter_new(docs) == [docs[0], docs[2]]
+    
+    # Documents seen in an earlier batch are filtered as well
+    assert deduplicator.filter_new([{'text': 'This is a test document'}]) == []
+
+def test_md5_simhash_dedup(test_config):
+    """Test that exact repeats skip SimHash and near duplicates are still caught"""
+    config = dict(test_config['dedup'], strategy='md5+simhash')
+    deduplicator = Deduplicator(config)
+    text = 'Stablecoins are cryptocurrencies designed to keep a stable value relative to a reference asset such as the US dollar'
+    
+    assert not deduplicator.is_duplicate({'text': text})
+    assert deduplicator.is_duplicate({'text': text + '.'})
+    with patch('utils.dedup.Simhash') as simhash:
+        assert deduplicator.is_duplicate({'text': text})
+        simhash.assert_not_called()
+    assert len(deduplicator.seen_simhashes) == 1
+
+def test_simhash_bands_match_linear_scan(test_config):
+    """Test that the banded SimHash index finds exactly the duplicates a linear scan finds"""
+    config = dict(test_config['dedup'], strategy='simhash', simhash_threshold=3)
+    deduplicator = Deduplicator(config)
+    
+    rng = np.random.default_rng(0)
+    bases = [int(v) for v in rng.integers(0, 2**63, size=20)]
+    values = []
+    for base in bases:
+        values.append(base)
+        for _ in range(5):
+            # Flip up to five random bits, so some variants fall just outside the threshold
+            flips = rng.choice(64, size=int(rng.integers(1, 6)), replace=False)
+            values.append(base ^ sum(1 << int(bit) for bit in flips))
+            
+    seen = []
+    for value in values:
+        expected = any(bin(s ^ value).count('1') <= 3 for s in seen)
+        with patch('utils.dedup.Simhash', side_effect=lambda _: Simhash(value)):
+            assert deduplicator.is_duplicate({'text': str(value)}) == expected
+        if not expected:
+            seen.append(value)
+
+def test_filter_seen_content(tmp_path, test_config):
+    """Test content fingerprints are filtered and persisted across instances"""
+    config = test_config['dedup'].copy()
+    config['fingerprint_path'] = str(tmp_path / 'fingerprints.bin')
+    deduplicator = Deduplicator(config)
+    
+    docs = [
+        {'text': 'This is a test document'},
+        {'text': 'This  is a test\ndocument'},  # Same content after whitespace normalization
+        {'text': 'Another document'}
+    ]
+    new_docs, fingerprints = deduplicator.filter_seen_content(docs)
+    assert new_docs == [docs[0], docs[2]]
+    assert len(fingerprints) == 2
+    
+    # Committed fingerprints are filtered from then on and persisted by the next save
+    deduplicator.commit_fingerprints(fingerprints)
+    assert deduplicator.filter_seen_content(docs) == ([], [])
+    deduplicator.save_fingerprints()
+    
+    # A new instance loads the saved fingerprints
+    restarted = Deduplicator(config)
+    assert restarted.filter_seen_content([{'text': 'Another document'}])[0] == []
+    assert restarted.filter_seen_content([{'text': 'Brand new content'}])[0] == [{'text': 'Brand new content'}]
+
+def test_filter_seen_content_failed_ingest(tmp_path, test_config):
+    """Test that content whose ingestion failed is not skipped on retry or after a restart"""
+    config = dict(test_config['dedup'], fingerprint_path=str(tmp_path / 'fingerprints.bin'))
+    deduplicator = Deduplicator(config)
+    failed = [{'text': 'Upload that failed to insert'}]
+    stored = [{'text': 'Upload that was stored'}]
+    
+    # The first upload fails after filtering, so its fingerprints are never committed
+    assert deduplicator.filter_seen_content(failed)[0] == failed
+    
+    # A later upload succeeds and saves
+    new_docs, fingerprints = deduplicator.filter_seen_content(stored)
+    deduplicator.commit_fingerprints(fingerprints)
+    deduplicator.save_fingerprints()
+    
+    # The failed content is retried in the same process and after a restart
+    assert deduplicator.filter_seen_content(failed)[0] == failed
+    restarted = Deduplicator(config)
+    assert restarted.filter_seen_content(failed)[0] == failed
+    assert restarted.filter_seen_content(stored)[0] == []
+
+def test_fingerprint_file_hash_mismatch(tmp_path, test_config):
+    """Test that a fingerprint file written with another hash function is ignored and replaced"""
+    config = dict(test_config['dedup'], fingerprint_path=str(tmp_path / 'fingerprints.bin'))
+    deduplicator = Deduplicator(config)
+    old = [{'text': 'Content fingerprinted by the old hash'}]
+    deduplicator.commit_fingerprints(deduplicator.filter_seen_content(old)[1])
+    deduplicator.save_fingerprints()
+    
+    # Switching between xxhash and the BLAKE2b fallback changes the header
+    with patch.object(Deduplicator, '_fingerprint_header', staticmethod(lambda: b'otherfp\0')):
+        switched = Deduplicator(config)
+        assert switched.seen_fingerprints == set()
+        new = [{'text': 'Content fingerprinted by the new hash'}]
+        switched.commit_fingerprints(switched.filter_seen_content(new)[1])
+        switched.save_fingerprints()
+        
+        # The file now holds only fingerprints of the new hash
+        restarted = Deduplicator(config)
+        assert restarted.filter_seen_content(new)[0] == []
+        assert restarted.filter_seen_content(old)[0] == old
 
 if __name__ == "__main__":
-    test_md5_dedup()
-    test_embedding_dedup()
-    print("All deduplication tests passed!")
\ No newline at end of file
+    # Run through pytest so the shared fixtures in conftest.py are available
+    sys.exit(pytest.main([__file__, "-v"]))
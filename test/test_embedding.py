@@ -5,60 +5,47 @@ from pathlib import Path
 # Add the project root to the path so we can import the modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import yaml
+import base64
+import numpy as np
+import pytest
 from embeddings.bairen_embedder import BairenEmbedder
 from unittest.mock import patch, MagicMock
+import orjson
 
-# Create a temporary config for testing
-test_config = {
-    'embedding': {
-        'api_key': 'test_api_key',
-        'model_name': 'test_model',
-        'batch_size': 2,
-        'timeout': 30,
-        'max_retries': 3
-    }
-}
-
-# Write test config to a temporary file
-config_path = Path(__file__).parent.parent / 'config.yaml'
-original_config_exists = config_path.exists()
-
-if not original_config_exists:
-    with open(config_path, 'w') as f:
-        yaml.dump(test_config, f)
-
-def test_l2_normalize():
+def test_l2_normalize(test_config):
     """Test L2 normalization function"""
-    embedder = BairenEmbedder()
+    embedder = BairenEmbedder(test_config['embedding'])
     
     # Test normalization
     vector = [3.0, 4.0]  # Length 5 vector
     normalized = embedder._l2_normalize(vector)
     
     # Check that the normalized vector has unit length
-    length = sum(x*x for x in normalized) ** 0.5
-    assert abs(length - 1.0) < 1e-6
+    np.testing.assert_allclose(np.linalg.norm(normalized), 1.0, atol=1e-6)
     
     # Check that the normalized vector is in the same direction
-    assert abs(normalized[0] - 0.6) < 1e-6  # 3/5
-    assert abs(normalized[1] - 0.8) < 1e-6  # 4/5
+    np.testing.assert_allclose(normalized, [0.6, 0.8], atol=1e-6)  # 3/5, 4/5
+    
+    # Zero vectors are left unchanged instead of producing NaNs
+    assert embedder._l2_normalize([0.0, 0.0]).tolist() == [0.0, 0.0]
 
-@patch('embeddings.bairen_embedder.requests.post')
-def test_embed(mock_post):
+@patch('embeddings.bairen_embedder.requests.Session.post')
+def test_embed(mock_post, test_config):
     """Test embedding function"""
     # Mock the API response
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = {
-        'data': [
-            {'embedding': [0.1, 0.2, 0.3]},
-            {'embedding': [0.4, 0.5, 0.6]}
-        ]
-    }
+    mock_response.content = orjson.dumps({
+        'output': {
+            'embeddings': [
+                {'index': 0, 'embedding': [0.1, 0.2, 0.3]},
+                {'index': 1, 'embedding': [0.4, 0.5, 0.6]}
+            ]
+        }
+    })
     mock_post.return_value = mock_response
     
-    embedder = BairenEmbedder()
+    embedder = BairenEmbedder(test_config['embedding'])
     
     texts = ["测试文本1", "测试文本2"]
     embeddings = embedder.embed(texts)
@@ -71,21 +58,23 @@ def test_embed(mock_post):
         length = sum(x*x for x in emb) ** 0.5
         assert abs(length - 1.0) < 1e-6
 
-@patch('embeddings.bairen_embedder.requests.post')
-def test_embed_with_retry(mock_post):
+@patch('embeddings.bairen_embedder.requests.Session.post')
+def test_embed_with_retry(mock_post, test_config):
     """Test embedding function with retry logic"""
     # Mock the API to fail the first time and succeed the second time
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = {
-        'data': [
-            {'embedding': [0.1, 0.2, 0.3]}
-        ]
-    }
+    mock_response.content = orjson.dumps({
+        'output': {
+            'embeddings': [
+                {'index': 0, 'embedding': [0.1, 0.2, 0.3]}
+            ]
+        }
+    })
     
     mock_post.side_effect = [Exception("API Error"), mock_response]
     
-    embedder = BairenEmbedder()
+    embedder = BairenEmbedder(test_config['embedding'])
     
     texts = ["测试文本"]
     embeddings = embedder.embed(texts)
@@ -94,12 +83,51 @@ def test_embed_with_retry(mock_post):
     assert len(embeddings) == 1
     assert len(embeddings[0]) == 3
 
-# Clean up temporary config file if it didn't exist before
-if not original_config_exists and config_path.exists():
-    config_path.unlink()
+@patch('embeddings.bairen_embedder.requests.Session.post')
+def test_embed_base64(mock_post, test_config):
+    """Test that base64 packed float32 embeddings are decoded"""
+    vectors = np.array([[3.0, 4.0], [0.0, 2.0]], dtype=np.float32)
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.content = orjson.dumps({
+        'output': {
+            'embeddings': [
+                {'index': i, 'embedding': base64.b64encode(vector.tobytes()).decode('ascii')}
+                for i, vector in enumerate(vectors)
+            ]
+        }
+    })
+    mock_post.return_value = mock_response
+    
+    embedder = BairenEmbedder(dict(test_config['embedding'], encoding_format='base64'))
+    embeddings = embedder.embed(["测试文本1", "测试文本2"])
+    
+    assert mock_post.call_args.kwargs['json']['parameters'] == {'encoding_format': 'base64'}
+    np.testing.assert_allclose(embeddings, [[0.6, 0.8], [0.0, 1.0]], atol=1e-6)
+
+@patch('embeddings.bairen_embedder.requests.Session.post')
+def test_embed_queries_cache(mock_post, test_config):
+    """Test that repeated queries are embedded only once"""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.content = orjson.dumps({
+        'output': {
+            'embeddings': [
+                {'index': 0, 'embedding': [0.1, 0.2, 0.3]}
+            ]
+        }
+    })
+    mock_post.return_value = mock_response
+    
+    embedder = BairenEmbedder(test_config['embedding'])
+    
+    first = embedder.embed_queries(["测试查询"])
+    second = embedder.embed_queries(["测试查询", "测试查询"])
+    
+    assert mock_post.call_count == 1
+    assert second.shape == (2, 3)
+    assert (second[0] == first[0]).all()
 
 if __name__ == "__main__":
-    test_l2_normalize()
-    test_embed()
-    test_embed_with_retry()
-    print("All embedding tests passed!")
\ No newline at end of file
+    # Run through pytest so the shared fixtures in conftest.py are available
+    sys.exit(pytest.main([__file__, "-v"]))
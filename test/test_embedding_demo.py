@@ -6,7 +6,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from embeddings.bairen_embedder import BairenEmbedder
-import yaml
+from utils.config import load_config
 
 # Load configuration
 config_path = Path(__file__).parent.parent / 'config.yaml'
@@ -21,9 +21,8 @@ def test_embedding():
         print("Config file not found. Please create config.yaml with your API key.")
         return
     
-    # Load config
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
+    # Load config, parsed once and shared by every test
+    config = load_config(str(config_path))
     
     # Check if API key is configured
     api_key = config.get('embedding', {}).get('api_key')
@@ -38,7 +37,7 @@ def test_embedding():
     
     # Initialize embedder
     try:
-        embedder = BairenEmbedder()
+        embedder = BairenEmbedder(config['embedding'])
         print(f"Embedder initialized successfully")
         print(f"Model: {embedder.model_name}")
         print(f"Batch size: {embedder.batch_size}")
@@ -67,26 +66,20 @@ def test_embedding():
         embeddings = embedder.embed(test_texts)
         
         print(f"Successfully generated {len(embeddings)} embeddings")
-        print(f"Embedding dimension: {len(embeddings[0]) if embeddings else 0}")
+        print(f"Embedding dimension: {embeddings.shape[1]}")
         print()
         
         # Show first few values of first embedding
-        if embeddings:
+        if len(embeddings):
             print("First embedding (first 10 values):")
             print([round(val, 6) for val in embeddings[0][:10]])
             print()
             
         # Test embedding similarity
         if len(embeddings) >= 2:
-            # Calculate cosine similarity between first two embeddings
-            import numpy as np
-            
-            # Normalize vectors
-            vec1 = np.array(embeddings[0])
-            vec2 = np.array(embeddings[1])
-            
-            # Cosine similarity
-            similarity = np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+            # Rows are unit length, so one matrix product gives all pairwise cosine similarities
+            similarities = embeddings @ embeddings.T
+            similarity = similarities[0, 1]
             
             print("Similarity test:")
             print(f"Cosine similarity between texts 1 and 2: {similarity:.6f}")
@@ -113,9 +106,8 @@ def test_single_text():
         print("Config file not found. Please create config.yaml with your API key.")
         return
     
-    # Load config
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
+    # Load config, parsed once and shared by every test
+    config = load_config(str(config_path))
     
     # Check if API key is configured
     api_key = config.get('embedding', {}).get('api_key')
@@ -125,7 +117,7 @@ def test_single_text():
         return
     
     try:
-        embedder = BairenEmbedder()
+        embedder = BairenEmbedder(config['embedding'])
         
         single_text = "这是一个测试句子，用于验证嵌入功能是否正常工作。"
         print(f"Input text: {single_text}")
@@ -151,9 +143,8 @@ def test_batch_processing():
         print("Config file not found. Please create config.yaml with your API key.")
         return
     
-    # Load config
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
+    # Load config, parsed once and shared by every test
+    config = load_config(str(config_path))
     
     # Check if API key is configured
     api_key = config.get('embedding', {}).get('api_key')
@@ -163,7 +154,7 @@ def test_batch_processing():
         return
     
     try:
-        embedder = BairenEmbedder()
+        embedder = BairenEmbedder(config['embedding'])
         
         # Create a larger batch of texts
         batch_texts = [
@@ -183,8 +174,8 @@ def test_batch_processing():
         
         # Verify all embeddings are normalized (L2 norm should be 1.0)
         import numpy as np
-        norms = [np.linalg.norm(emb) for emb in embeddings]
-        print(f"L2 norms (should be ~1.0): {[round(norm, 6) for norm in norms[:3]]}")
+        norms = np.linalg.norm(embeddings, axis=1)
+        print(f"L2 norms (should be ~1.0): {norms[:3].round(6).tolist()}")
         
     except Exception as e:
         print(f"Error: {e}")
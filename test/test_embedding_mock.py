@@ -2,20 +2,20 @@ import sys
 import os
 from pathlib import Path
 from unittest.mock import patch, MagicMock
+import orjson
 import numpy as np
 
 # Add the project root to the path so we can import the modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from embeddings.bairen_embedder import BairenEmbedder
-import yaml
 
 def test_embedding_with_mock():
     """Test embedding functionality with mocked API calls"""
     print("Testing Bairen Embedder with mocked API...")
     print("=" * 50)
     
-    # Create a temporary config for testing
+    # Test configuration, passed to the embedder directly
     test_config = {
         'embedding': {
             'api_key': 'test_api_key',
@@ -26,30 +26,24 @@ def test_embedding_with_mock():
         }
     }
     
-    # Write test config to a temporary file
-    config_path = Path(__file__).parent.parent / 'config.yaml'
-    original_config_exists = config_path.exists()
-    
-    if not original_config_exists:
-        with open(config_path, 'w') as f:
-            yaml.dump(test_config, f)
-    
     try:
-        # Mock the requests.post function
-        with patch('embeddings.bairen_embedder.requests.post') as mock_post:
+        # Mock the pooled session's post method
+        with patch('embeddings.bairen_embedder.requests.Session.post') as mock_post:
             # Configure the mock to return a predefined response
             mock_response = MagicMock()
             mock_response.status_code = 200
-            mock_response.json.return_value = {
-                'data': [
-                    {'embedding': [0.1, 0.2, 0.3, 0.4, 0.5]},
-                    {'embedding': [0.2, 0.3, 0.4, 0.5, 0.6]}
-                ]
-            }
+            mock_response.content = orjson.dumps({
+                'output': {
+                    'embeddings': [
+                        {'index': 0, 'embedding': [0.1, 0.2, 0.3, 0.4, 0.5]},
+                        {'index': 1, 'embedding': [0.2, 0.3, 0.4, 0.5, 0.6]}
+                    ]
+                }
+            })
             mock_post.return_value = mock_response
             
             # Initialize embedder
-            embedder = BairenEmbedder()
+            embedder = BairenEmbedder(test_config['embedding'])
             print(f"Embedder initialized successfully")
             print(f"Model: {embedder.model_name}")
             print(f"Batch size: {embedder.batch_size}")
@@ -71,7 +65,7 @@ def test_embedding_with_mock():
             embeddings = embedder.embed(test_texts)
             
             print(f"Successfully generated {len(embeddings)} embeddings")
-            print(f"Embedding dimension: {len(embeddings[0]) if embeddings else 0}")
+            print(f"Embedding dimension: {embeddings.shape[1]}")
             print()
             
             # Show embeddings
@@ -79,11 +73,10 @@ def test_embedding_with_mock():
                 print(f"Embedding {i+1}: {[round(val, 6) for val in emb]}")
             
             # Verify L2 normalization
-            for i, emb in enumerate(embeddings):
-                norm = np.linalg.norm(emb)
+            for i, norm in enumerate(np.linalg.norm(embeddings, axis=1)):
                 print(f"L2 norm of embedding {i+1}: {norm:.6f}")
             
-            # Verify that requests.post was called
+            # Verify that the session's post was called
             print(f"\nMock verification:")
             print(f"API calls made: {mock_post.call_count}")
             if mock_post.call_count > 0:
@@ -93,17 +86,13 @@ def test_embedding_with_mock():
         print(f"Error: {e}")
         import traceback
         traceback.print_exc()
-    finally:
-        # Clean up temporary config file if it didn't exist before
-        if not original_config_exists and config_path.exists():
-            config_path.unlink()
 
 def test_embedding_batching():
     """Test batching functionality with mock"""
     print("\n\nTesting batch processing with mocked API...")
     print("=" * 50)
     
-    # Create a temporary config for testing
+    # Test configuration, passed to the embedder directly
     test_config = {
         'embedding': {
             'api_key': 'test_api_key',
@@ -114,35 +103,30 @@ def test_embedding_batching():
         }
     }
     
-    # Write test config to a temporary file
-    config_path = Path(__file__).parent.parent / 'config.yaml'
-    original_config_exists = config_path.exists()
-    
-    if not original_config_exists:
-        with open(config_path, 'w') as f:
-            yaml.dump(test_config, f)
-    
     try:
-        # Mock the requests.post function
-        with patch('embeddings.bairen_embedder.requests.post') as mock_post:
+        # Mock the pooled session's post method
+        with patch('embeddings.bairen_embedder.requests.Session.post') as mock_post:
             # Configure the mock to return a predefined response
             def mock_response_func(*args, **kwargs):
                 mock_response = MagicMock()
                 mock_response.status_code = 200
                 # Return different embeddings based on the number of inputs
                 json_data = kwargs.get('json', {})
-                input_texts = json_data.get('input', [])
-                mock_response.json.return_value = {
-                    'data': [
-                        {'embedding': [0.1*i, 0.2*i, 0.3*i, 0.4*i, 0.5*i] for i in range(1, len(input_texts)+1)}
-                    ]
-                }
+                input_texts = json_data.get('input', {}).get('contents', [])
+                mock_response.content = orjson.dumps({
+                    'output': {
+                        'embeddings': [
+                            {'index': i, 'embedding': [0.1*(i+1), 0.2*(i+1), 0.3*(i+1), 0.4*(i+1), 0.5*(i+1)]}
+                            for i in range(len(input_texts))
+                        ]
+                    }
+                })
                 return mock_response
             
             mock_post.side_effect = mock_response_func
             
             # Initialize embedder
-            embedder = BairenEmbedder()
+            embedder = BairenEmbedder(test_config['embedding'])
             print(f"Embedder initialized successfully")
             print(f"Batch size: {embedder.batch_size}")
             print()
@@ -164,7 +148,7 @@ def test_embedding_batching():
             embeddings = embedder.embed(test_texts)
             
             print(f"Successfully generated {len(embeddings)} embeddings")
-            print(f"Embedding dimension: {len(embeddings[0]) if embeddings else 0}")
+            print(f"Embedding dimension: {embeddings.shape[1]}")
             print()
             
             # Verify batching - should have made 3 API calls (7 texts with batch size 3)
@@ -181,10 +165,6 @@ def test_embedding_batching():
         print(f"Error: {e}")
         import traceback
         traceback.print_exc()
-    finally:
-        # Clean up temporary config file if it didn't exist before
-        if not original_config_exists and config_path.exists():
-            config_path.unlink()
 
 if __name__ == "__main__":
     test_embedding_with_mock()
@@ -0,0 +1,156 @@
+import sys
+import asyncio
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import orjson
+import pytest
+from openai import APITimeoutError, AuthenticationError, RateLimitError
+from tenacity import wait_none
+from utils.llm_processor import LLMProcessor
+
+REQUEST = httpx.Request('POST', 'https://llm.test/chat/completions')
+
+class FakeClient:
+    """Async OpenAI stand-in that records how many requests are in flight"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.attempts = 0
+        # Errors raised by the next requests, in order, before they succeed
+        self.errors = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        pass
+    
+    async def create(self, messages, **kwargs):
+        with self.lock:
+            self.attempts += 1
+            if self.errors:
+                raise self.errors.pop(0)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        if 'BAD' in messages[1]['content']:
+            content = 'not json'
+        else:
+            content = orjson.dumps({'content': 'integrated', 'type': '稳定币', 'timestamp': 0, 'source': 'llm'}).decode()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+@pytest.fixture
+def processor(client):
+    processor = LLMProcessor()
+    processor._create_client = lambda: client
+    return processor
+
+def test_process_chunks(processor):
+    """Test that chunks are integrated in order and failed chunks fall back to the original"""
+    chunks = [{'text': f'chunk {i}', 'source': 'doc', 'id': i} for i in range(5)]
+    chunks[2]['text'] = 'BAD chunk'
+    
+    results = processor.process_chunks(chunks)
+    
+    assert [r['id'] for r in results] == list(range(5))
+    assert results[2] is chunks[2]
+    assert results[0]['text'] == 'integrated'
+    assert results[0]['domain'] == '稳定币'
+
+def test_process_chunks_inside_running_loop(processor):
+    """Test that process_chunks works when called from code already running an event loop"""
+    chunks = [{'text': f'chunk {i}', 'source': 'doc'} for i in range(3)]
+    
+    async def handler():
+        return processor.process_chunks(chunks)
+        
+    results = asyncio.run(handler())
+    
+    assert [r['text'] for r in results] == ['integrated'] * 3
+
+def test_concurrency_shared_across_workers(processor, client):
+    """Test that the concurrency limit holds across workers running their own event loops"""
+    processor.concurrency = 3
+    processor._request_slots = threading.BoundedSemaphore(3)
+    processor._slot_waiters = ThreadPoolExecutor(max_workers=3)
+    chunks = [{'text': f'chunk {i}', 'source': 'doc'} for i in range(12)]
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(processor.process_chunks, [chunks] * 4))
+        
+    assert all(r['text'] == 'integrated' for result in results for r in result)
+    assert client.peak == 3
+
+def test_retries_transient_errors(processor, client, monkeypatch):
+    """Test that rate limits and timeouts are retried until the request succeeds"""
+    monkeypatch.setattr('utils.llm_processor.wait_exponential_jitter', lambda **kwargs: wait_none())
+    client.errors = [
+        RateLimitError('rate limited', response=httpx.Response(429, request=REQUEST), body=None),
+        APITimeoutError(request=REQUEST),
+        RateLimitError('rate limited', response=httpx.Response(429, request=REQUEST), body=None),
+    ]
+    
+    result = processor.integrate_knowledge('chunk', 'doc')
+    
+    assert result['content'] == 'integrated'
+    assert client.attempts == 4
+
+def test_retry_limits(processor, client, monkeypatch):
+    """Test that non-retryable errors raise at once and retries stop after max_retries"""
+    monkeypatch.setattr('utils.llm_processor.wait_exponential_jitter', lambda **kwargs: wait_none())
+    client.errors = [AuthenticationError('bad key', response=httpx.Response(401, request=REQUEST), body=None)]
+    with pytest.raises(AuthenticationError):
+        processor.integrate_knowledge('chunk', 'doc')
+    assert client.attempts == 1
+    
+    client.attempts = 0
+    client.errors = [APITimeoutError(request=REQUEST) for _ in range(processor.max_retries + 2)]
+    with pytest.raises(APITimeoutError):
+        processor.integrate_knowledge('chunk', 'doc')
+    assert client.attempts == processor.max_retries + 1
+
+def test_fan_out_bounded_per_loop(processor, client, monkeypatch):
+    """Test that one call starts at most concurrency requests and waits off the default executor"""
+    processor.concurrency = 3
+    processor._request_slots = threading.BoundedSemaphore(3)
+    processor._slot_waiters = ThreadPoolExecutor(max_workers=3)
+    active = 0
+    peak = 0
+    integrate_async = processor._integrate_async
+    
+    async def counting_integrate(*args):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            return await integrate_async(*args)
+        finally:
+            active -= 1
+            
+    monkeypatch.setattr(processor, '_integrate_async', counting_integrate)
+    monkeypatch.setattr(asyncio, 'to_thread', None)
+    chunks = [{'text': f'chunk {i}', 'source': 'doc'} for i in range(50)]
+    
+    results = processor.process_chunks(chunks)
+    
+    assert all(r['text'] == 'integrated' for r in results)
+    assert peak == 3
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
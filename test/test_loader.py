@@ -1,58 +1,29 @@
 import sys
 import os
-import tempfile
 import pytest
 from pathlib import Path
 
 # Add the project root to the path so we can import the modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from loaders import loader_manager
 from loaders.loader_manager import DocumentLoaderManager
 from chunking.splitter import TextSplitter
-import yaml
-
-# Create a temporary config for testing
-test_config = {
-    'chunking': {
-        'strategy': 'sliding_token',
-        'chunk_size': 128,
-        'chunk_overlap': 32
-    }
-}
-
-# Write test config to a temporary file
-config_path = Path(__file__).parent.parent / 'config.yaml'
-if not config_path.exists():
-    with open(config_path, 'w') as f:
-        yaml.dump(test_config, f)
 
 class TestDocumentLoaderManager:
     """Test the DocumentLoaderManager class"""
     
-    def setup_method(self):
-        """Set up test resources"""
-        self.loader_manager = DocumentLoaderManager()
-        
-        # Create temporary test files
-        self.test_dir = Path(tempfile.mkdtemp())
-        
-        # Create a test text file with UTF-8 encoding
-        self.test_text_file = self.test_dir / "test.txt"
-        with open(self.test_text_file, 'w', encoding='utf-8') as f:
-            f.write("This is a test document.\nIt contains multiple lines of text.\nUsed to test document loader functionality.")
-            
-    def teardown_method(self):
-        """Clean up test resources"""
-        # Clean up temporary files
-        if self.test_text_file.exists():
-            self.test_text_file.unlink()
-        if self.test_dir.exists():
-            self.test_dir.rmdir()
+    @pytest.fixture
+    def text_file(self, tmp_path):
+        """Write a UTF-8 test text file into the test's temporary directory"""
+        text_file = tmp_path / "test.txt"
+        text_file.write_text("This is a test document.\nIt contains multiple lines of text.\nUsed to test document loader functionality.", encoding='utf-8')
+        return text_file
     
-    def test_load_document(self):
+    def test_load_document(self, text_file):
         """Test loading a single document"""
-        print(f"\nLoading document from: {self.test_text_file}")
-        documents = self.loader_manager.load_document(self.test_text_file, "test_domain")
+        print(f"\nLoading document from: {text_file}")
+        documents = DocumentLoaderManager().load_document(text_file, "test_domain")
         
         print(f"Loaded {len(documents)} documents")
         for i, doc in enumerate(documents):
@@ -66,14 +37,26 @@ class TestDocumentLoaderManager:
         assert len(documents) == 1
         doc = documents[0]
         assert doc['domain'] == "test_domain"
-        assert doc['source'] == str(self.test_text_file.absolute())
+        assert doc['source'] == str(text_file.absolute())
         assert 'This is a test document' in doc['text']
         assert 'metadata' in doc
         
-    def test_load_directory(self):
+    def test_load_large_text_document(self, text_file, monkeypatch):
+        """Test that memory mapped text files load the same as small ones"""
+        text_file.write_text("大文件测试。\nLarge file test.", encoding='utf-8')
+        expected = DocumentLoaderManager().load_document(text_file, "test_domain")
+        
+        monkeypatch.setattr(loader_manager, 'MMAP_THRESHOLD_BYTES', 0)
+        assert isinstance(loader_manager._text_loader(str(text_file)), loader_manager._MmapTextLoader)
+        documents = DocumentLoaderManager().load_document(text_file, "test_domain")
+        
+        assert [doc['text'] for doc in documents] == [doc['text'] for doc in expected]
+        assert [doc['metadata'] for doc in documents] == [doc['metadata'] for doc in expected]
+        
+    def test_load_directory(self, text_file):
         """Test loading documents from a directory"""
-        print(f"\nLoading documents from directory: {self.test_dir}")
-        documents = self.loader_manager.load_directory(self.test_dir, "test_domain")
+        print(f"\nLoading documents from directory: {text_file.parent}")
+        documents = DocumentLoaderManager().load_directory(text_file.parent, "test_domain")
         
         print(f"Loaded {len(documents)} documents from directory")
         for i, doc in enumerate(documents):
@@ -87,8 +70,21 @@ class TestDocumentLoaderManager:
         assert len(documents) == 1
         doc = documents[0]
         assert doc['domain'] == "test_domain"
-        assert doc['source'] == str(self.test_text_file.absolute())
+        assert doc['source'] == str(text_file.absolute())
         assert 'This is a test document' in doc['text']
 
+    def test_load_directory_multiple_files(self, text_file):
+        """Test loading several documents from a directory in parallel"""
+        for i in range(3):
+            (text_file.parent / f"extra_{i}.txt").write_text(f"Extra document number {i}.", encoding='utf-8')
+            
+        documents = DocumentLoaderManager(max_workers=2).load_directory(text_file.parent, "test_domain")
+        
+        assert len(documents) == 4
+        assert all(doc['domain'] == "test_domain" for doc in documents)
+        texts = [doc['text'] for doc in documents]
+        for i in range(3):
+            assert f"Extra document number {i}." in texts
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
@@ -25,7 +25,7 @@ for collection_name in collections:
         if utility.has_collection(collection_name):
             # 获取表的统计信息
             collection = Collection(collection_name)
-            collection.load()  # 加载表以获取准确的信息
+            # num_entities 来自元数据统计，无需先 load() 把整个索引加载进内存
             num_entities = collection.num_entities
             print(f"  - {collection_name}: {num_entities} 条记录")
             
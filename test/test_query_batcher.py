@@ -0,0 +1,66 @@
+import sys
+import asyncio
+from pathlib import Path
+
+# Add the project root to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from unittest.mock import MagicMock
+from retrieval.query_batcher import QueryBatcher
+
+def test_concurrent_queries_share_one_search():
+    """Test that concurrent queries with the same filters are embedded and searched together"""
+    embed_fn = MagicMock(side_effect=lambda queries: np.arange(len(queries), dtype=np.float32)[:, None])
+    search_fn = MagicMock(side_effect=lambda embeddings, **filters: [
+        [{'content': f"result {int(e[0])}"}] for e in embeddings
+    ])
+    batcher = QueryBatcher(embed_fn, search_fn, max_batch_size=32, max_wait_ms=5)
+    
+    async def run():
+        return await asyncio.gather(*(batcher.search(f"query {i}", domain='test') for i in range(3)))
+    
+    results = asyncio.run(run())
+    
+    assert embed_fn.call_count == 1
+    assert search_fn.call_count == 1
+    assert [r[0]['content'] for r in results] == ['result 0', 'result 1', 'result 2']
+
+def test_queries_grouped_by_filters():
+    """Test that queries with different filters are searched separately but embedded once"""
+    embed_fn = MagicMock(side_effect=lambda queries: np.arange(len(queries), dtype=np.float32)[:, None])
+    search_fn = MagicMock(side_effect=lambda embeddings, **filters: [
+        [{'content': f"{filters['domain']} {int(e[0])}"}] for e in embeddings
+    ])
+    batcher = QueryBatcher(embed_fn, search_fn, max_batch_size=3, max_wait_ms=5)
+    
+    async def run():
+        return await asyncio.gather(
+            batcher.search("a", domain='x'),
+            batcher.search("b", domain='y'),
+            batcher.search("c", domain='x')
+        )
+    
+    results = asyncio.run(run())
+    
+    assert embed_fn.call_count == 1
+    assert search_fn.call_count == 2
+    assert [r[0]['content'] for r in results] == ['x 0', 'y 1', 'x 2']
+
+def test_search_error_propagates():
+    """Test that a failed batch raises in every waiting caller"""
+    embed_fn = MagicMock(side_effect=RuntimeError("embedding failed"))
+    batcher = QueryBatcher(embed_fn, MagicMock())
+    
+    async def run():
+        return await asyncio.gather(batcher.search("a"), batcher.search("b"), return_exceptions=True)
+    
+    results = asyncio.run(run())
+    
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+if __name__ == "__main__":
+    test_concurrent_queries_share_one_search()
+    test_queries_grouped_by_filters()
+    test_search_error_propagates()
+    print("All query batcher tests passed!")
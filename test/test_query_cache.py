@@ -0,0 +1,49 @@
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.query_cache import QueryCache
+
+def test_get_put():
+    """Test cache hits, misses and statistics"""
+    cache = QueryCache(max_size=4)
+    
+    assert cache.get("missing") is None
+    cache.put("query", [1, 2, 3])
+    assert cache.get("query") == [1, 2, 3]
+    
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['size'] == 1
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted first"""
+    cache = QueryCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+def test_ttl_expiry():
+    """Test that entries expire after their time-to-live"""
+    cache = QueryCache(max_size=2, ttl_seconds=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+if __name__ == "__main__":
+    test_get_put()
+    test_lru_eviction()
+    test_ttl_expiry()
+    print("All query cache tests passed!")
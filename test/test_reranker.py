@@ -5,33 +5,13 @@ from pathlib import Path
 # Add the project root to the path so we can import the modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import yaml
+import pytest
 from retrieval.reranker import Reranker
 
-# Create a temporary config for testing
-test_config = {
-    'reranker': {
-        'mode': 'embedding_bm25_mixed',
-        'weights': {
-            'ann': 0.7,
-            'bm25': 0.3
-        }
-    }
-}
-
-# Write test config to a temporary file
-config_path = Path(__file__).parent.parent / 'config.yaml'
-original_config_exists = config_path.exists()
-
-if not original_config_exists:
-    with open(config_path, 'w') as f:
-        yaml.dump(test_config, f)
-
-def test_bm25_rerank():
+def test_bm25_rerank(test_config):
     """Test BM25 reranking"""
-    config = test_config.copy()
-    config['reranker']['mode'] = 'cross_encoder'  # Actually uses BM25 simulation
-    reranker = Reranker()
+    config = dict(test_config['reranker'], mode='cross_encoder')  # Actually uses BM25 simulation
+    reranker = Reranker(config)
     
     query = "什么是人工智能"
     candidates = [
@@ -51,9 +31,9 @@ def test_bm25_rerank():
     # Check that final scores are added
     assert all('final_score' in candidate for candidate in reranked)
 
-def test_mixed_rerank():
+def test_mixed_rerank(test_config):
     """Test mixed reranking"""
-    reranker = Reranker()
+    reranker = Reranker(test_config['reranker'])
     
     query = "什么是人工智能"
     candidates = [
@@ -73,11 +53,17 @@ def test_mixed_rerank():
     # Check that final scores are added
     assert all('final_score' in candidate for candidate in reranked)
 
-# Clean up temporary config file if it didn't exist before
-if not original_config_exists and config_path.exists():
-    config_path.unlink()
+def test_rerank_top_k(test_config):
+    """Test that top_k keeps only the best candidates in score order"""
+    reranker = Reranker(test_config['reranker'])
+    
+    candidates = [{'content': f'候选文档 {i}', 'distance': d} for i, d in enumerate([0.2, 0.9, 0.5, 0.9, 0.1])]
+    full = reranker.rerank("查询", [dict(c) for c in candidates])
+    top = reranker.rerank("查询", [dict(c) for c in candidates], top_k=2)
+    
+    assert [c['content'] for c in top] == [c['content'] for c in full[:2]]
+    assert reranker.rerank("查询", [dict(c) for c in candidates], top_k=0) == []
 
 if __name__ == "__main__":
-    test_bm25_rerank()
-    test_mixed_rerank()
-    print("All reranker tests passed!")
\ No newline at end of file
+    # Run through pytest so the shared fixtures in conftest.py are available
+    sys.exit(pytest.main([__file__, "-v"]))
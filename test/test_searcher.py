@@ -5,40 +5,17 @@ from pathlib import Path
 # Add the project root to the path so we can import the modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import yaml
+import pytest
 from retrieval.searcher import Searcher
 from unittest.mock import patch, MagicMock
 
-# Create a temporary config for testing
-test_config = {
-    'retrieval': {
-        'top_k': 5,
-        'domain_filter': True
-    },
-    'embedding': {
-        'api_key': 'test_api_key',
-        'model_name': 'test_model',
-        'batch_size': 2,
-        'timeout': 30,
-        'max_retries': 3
-    }
-}
-
-# Write test config to a temporary file
-config_path = Path(__file__).parent.parent / 'config.yaml'
-original_config_exists = config_path.exists()
-
-if not original_config_exists:
-    with open(config_path, 'w') as f:
-        yaml.dump(test_config, f)
-
-@patch('retrieval.searcher.BairenEmbedder')
-@patch('retrieval.searcher.MilvusClient')
-def test_search(mock_milvus_client, mock_embedder):
+@patch('retrieval.searcher.get_embedder')
+@patch('retrieval.searcher.get_milvus_client')
+def test_search(mock_milvus_client, mock_embedder, test_config):
     """Test search functionality"""
     # Mock the embedder
     mock_embedder_instance = MagicMock()
-    mock_embedder_instance.embed.return_value = [[0.1, 0.2, 0.3]]
+    mock_embedder_instance.embed_queries.return_value = [[0.1, 0.2, 0.3]]
     mock_embedder.return_value = mock_embedder_instance
     
     # Mock the Milvus client
@@ -54,12 +31,12 @@ def test_search(mock_milvus_client, mock_embedder):
     ]
     mock_milvus_client.return_value = mock_milvus_instance
     
-    searcher = Searcher()
+    searcher = Searcher(test_config['retrieval'])
     
     results = searcher.search("测试查询", "test_domain")
     
     # Check that embedder was called
-    mock_embedder_instance.embed.assert_called_once_with(["测试查询"])
+    mock_embedder_instance.embed_queries.assert_called_once_with(["测试查询"])
     
     # Check that Milvus client was called
     mock_milvus_instance.search.assert_called_once()
@@ -68,10 +45,58 @@ def test_search(mock_milvus_client, mock_embedder):
     assert len(results) == 1
     assert results[0]['content'] == 'This is a test result'
 
-# Clean up temporary config file if it didn't exist before
-if not original_config_exists and config_path.exists():
-    config_path.unlink()
+@patch('retrieval.searcher.get_embedder')
+@patch('retrieval.searcher.get_milvus_client')
+def test_search_cache(mock_milvus_client, mock_embedder, test_config):
+    """Test that repeated queries are served from cache until the collection changes"""
+    mock_embedder_instance = MagicMock()
+    mock_embedder_instance.embed_queries.return_value = [[0.1, 0.2, 0.3]]
+    mock_embedder.return_value = mock_embedder_instance
+    
+    mock_milvus_instance = MagicMock()
+    mock_milvus_instance.collection_version = 0
+    mock_milvus_instance.search.return_value = [{'id': 1, 'content': 'cached result'}]
+    mock_milvus_client.return_value = mock_milvus_instance
+    
+    searcher = Searcher(test_config['retrieval'])
+    
+    searcher.search("测试查询", "test_domain")
+    results = searcher.search(" 测试查询 ", "test_domain")
+    assert mock_milvus_instance.search.call_count == 1
+    assert results[0]['content'] == 'cached result'
+    
+    # Scores written by the reranker stay with the caller, not in the cache
+    results[0]['final_score'] = 1.0
+    assert 'final_score' not in searcher.search("测试查询", "test_domain")[0]
+    
+    # An insert bumps the collection version and invalidates cached results
+    mock_milvus_instance.collection_version = 1
+    searcher.search("测试查询", "test_domain")
+    assert mock_milvus_instance.search.call_count == 2
+
+@patch('retrieval.searcher.get_embedder')
+@patch('retrieval.searcher.get_milvus_client')
+def test_batch_search(mock_milvus_client, mock_embedder, test_config):
+    """Test that batch search embeds once and searches once per domain"""
+    mock_embedder_instance = MagicMock()
+    mock_embedder_instance.embed_queries.side_effect = lambda texts: [[float(i)] for i in range(len(texts))]
+    mock_embedder.return_value = mock_embedder_instance
+    
+    mock_milvus_instance = MagicMock()
+    mock_milvus_instance.collection_version = 0
+    mock_milvus_instance.search_many.side_effect = lambda embeddings, domain, limit: [
+        [{'content': f"{domain} {embedding[0]}"}] for embedding in embeddings
+    ]
+    mock_milvus_client.return_value = mock_milvus_instance
+    
+    searcher = Searcher(test_config['retrieval'])
+    
+    results = searcher.batch_search(["查询1", "查询2", "查询3"], ["a", "b", "a"])
+    
+    mock_embedder_instance.embed_queries.assert_called_once_with(["查询1", "查询2", "查询3"])
+    assert mock_milvus_instance.search_many.call_count == 2
+    assert [r[0]['content'] for r in results] == ['a 0.0', 'b 1.0', 'a 2.0']
 
 if __name__ == "__main__":
-    test_search()
-    print("All searcher tests passed!")
\ No newline at end of file
+    # Run through pytest so the shared fixtures in conftest.py are available
+    sys.exit(pytest.main([__file__, "-v"]))
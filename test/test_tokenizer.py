@@ -5,7 +5,7 @@ from pathlib import Path
 # Add the project root to the path so we can import the modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import yaml
+from utils import tokenizer
 from utils.tokenizer import Tokenizer
 
 def test_tokenizer():
@@ -23,6 +23,40 @@ def test_tokenizer():
     assert isinstance(count, int)
     assert count > 0
 
+def test_token_offsets(monkeypatch):
+    """Test that token offsets slice the tokens out of the original text"""
+    text = "这是一个测试句子。 Hello  world"
+    starts, ends = Tokenizer.token_offsets(text)
+    assert [text[s:e] for s, e in zip(starts, ends)] == Tokenizer.tokenize(text)
+    
+    # Text without tokens has no offsets at all
+    assert Tokenizer.token_offsets("") == ([], [])
+    
+    # The whitespace fallback drops the spaces between tokens but keeps them in slices
+    monkeypatch.setattr(tokenizer, 'JIEBA_AVAILABLE', False)
+    text = "Hello  world\nagain"
+    starts, ends = Tokenizer.token_offsets(text)
+    assert [text[s:e] for s, e in zip(starts, ends)] == ["Hello", "world", "again"]
+    assert text[starts[0]:ends[1]] == "Hello  world"
+    assert Tokenizer.token_offsets("") == ([], [])
+
+def test_cache_skips_long_texts():
+    """Test that only short texts are cached, so whole chunks do not pile up in memory"""
+    tokenizer._segment_cached.cache_clear()
+    tokenizer._count_segments_cached.cache_clear()
+    
+    short = "短查询"
+    long = "这是一个很长的分块。" * 100
+    assert Tokenizer.tokenize(long) == Tokenizer.tokenize(long)
+    assert Tokenizer.count_tokens(long) == len(Tokenizer.tokenize(long))
+    assert tokenizer._segment_cached.cache_info().currsize == 0
+    assert tokenizer._count_segments_cached.cache_info().currsize == 0
+    
+    Tokenizer.tokenize(short)
+    Tokenizer.count_tokens(short)
+    assert tokenizer._segment_cached.cache_info().currsize == 1
+    assert tokenizer._count_segments_cached.cache_info().currsize == 1
+
 if __name__ == "__main__":
     test_tokenizer()
     print("All tokenizer tests passed!")
\ No newline at end of file
@@ -0,0 +1,46 @@
+import math
+from collections import Counter
+from typing import List
+import numpy as np
+
+def bm25_score(query_tokens: List[str], doc_tokens_list: List[List[str]],
+               k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """
+    Score documents against a query with Okapi BM25.
+
+    Document frequencies and average length are taken from the given documents only,
+    which is what reranking a small candidate set needs.
+
+    Args:
+        query_tokens (List[str]): Query tokens, repeated tokens count repeatedly
+        doc_tokens_list (List[List[str]]): Tokens of every document
+        k1 (float): Term frequency saturation
+        b (float): Document length normalization strength
+
+    Returns:
+        np.ndarray: BM25 score of every document
+    """
+    num_docs = len(doc_tokens_list)
+    scores = np.zeros(num_docs, dtype=np.float64)
+    if num_docs == 0:
+        return scores
+
+    term_freqs = [Counter(tokens) for tokens in doc_tokens_list]
+    doc_freqs = Counter()
+    for tf in term_freqs:
+        doc_freqs.update(tf.keys())
+
+    doc_lens = np.fromiter((len(tokens) for tokens in doc_tokens_list), dtype=np.float64, count=num_docs)
+    avg_doc_len = doc_lens.mean() or 1.0
+    # Length-dependent part of the BM25 denominator, shared by every query term
+    length_norm = k1 * (1 - b + b * doc_lens / avg_doc_len)
+
+    for term, query_tf in Counter(query_tokens).items():
+        df = doc_freqs.get(term)
+        if not df:
+            continue
+        idf = math.log((num_docs - df + 0.5) / (df + 0.5) + 1)
+        tf = np.fromiter((freqs.get(term, 0) for freqs in term_freqs), dtype=np.float64, count=num_docs)
+        scores += query_tf * idf * tf * (k1 + 1) / (tf + length_norm)
+
+    return scores
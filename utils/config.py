@@ -0,0 +1,28 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import yaml
+
+# Default configuration file at the project root
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
+
+# libyaml's C loader parses several times faster; PyYAML built without it only has the Python one
+_SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+@lru_cache(maxsize=None)
+def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load and cache the YAML configuration.
+
+    The file is parsed once per path and the same dict is shared by every caller,
+    so callers must treat it as read-only.
+
+    Args:
+        config_path (Optional[str]): Path to the configuration file, defaults to config.yaml
+            at the project root
+
+    Returns:
+        Dict[str, Any]: Parsed configuration
+    """
+    with open(config_path or DEFAULT_CONFIG_PATH, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=_SafeLoader)
@@ -1,6 +1,12 @@
 import hashlib
-from typing import List, Dict, Any
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Tuple
 import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 try:
     from simhash import Simhash
@@ -8,9 +14,38 @@ try:
 except ImportError:
     SIMHASH_AVAILABLE = False
 
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# Hamming weight of an int; int.bit_count (Python 3.10+) runs as a hardware popcount
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:
+    def _popcount(value: int) -> int:
+        return bin(value).count('1')
+
 class Deduplicator:
     """Document deduplication utility supporting multiple strategies."""
     
+    # Strategies that drop documents whose text hashes to an already seen digest
+    EXACT_STRATEGIES = ('md5', 'xxh3', 'sha256')
+    # Fingerprint width of the simhash library
+    SIMHASH_BITS = 64
+    # Rows preallocated for seen embeddings before the buffer first grows
+    INITIAL_EMBEDDING_CAPACITY = 1024
+    # Bytes of int8 codes compared per step of the flat scan; NumPy has no int8 BLAS and
+    # widens the codes to float32 first, so blocks keep that temporary in cache
+    EMBEDDING_SCAN_BLOCK_BYTES = 256 * 1024
+    
     def __init__(self, config: Dict[str, Any]):
         """
         Initialize deduplicator with configuration.
@@ -23,11 +58,58 @@ class Deduplicator:
         self.md5_threshold = config.get('md5_threshold', 1.0)
         self.simhash_threshold = config.get('simhash_threshold', 3)
         self.embedding_threshold = config.get('embedding_threshold', 0.95)
+        # Index for embedding dedup: 'flat' scans every seen vector, 'hnsw' uses an
+        # approximate FAISS HNSW graph with logarithmic lookups, 'auto' scans until
+        # hnsw_min_vectors are seen and then moves them into an HNSW graph
+        self.embedding_index = config.get('embedding_index', 'flat')
+        self.hnsw_m = config.get('hnsw_m', 32)
+        self.hnsw_ef_search = config.get('hnsw_ef_search', 64)
+        self.hnsw_min_vectors = config.get('hnsw_min_vectors', 10000)
+        # Directory for a temporary file backing the seen embedding codes with a memory map,
+        # so only the pages in use stay resident; None keeps them in memory. The file is
+        # scratch space: each instance gets its own, removed once the instance is done with it
+        self.embedding_scratch_dir = config.get('embedding_scratch_dir')
+        self._embedding_file = None
         
         # Storage for seen items
-        self.seen_md5s = set()
+        # Digests of the 'md5' strategies, which hash with BLAKE2b-128 but keep their
+        # config name; seen_md5s is kept as an alias for existing callers
+        self.seen_hashes = set()
+        self.seen_md5s = self.seen_hashes
+        self.seen_xxh3s = set()
+        self.seen_sha256s = set()
+        # Seen SimHash fingerprints as plain ints
         self.seen_simhashes = []
-        self.seen_embeddings = []
+        # Banded LSH over the fingerprints: with simhash_threshold + 1 bands, any fingerprint
+        # within the threshold matches at least one band exactly, so only fingerprints sharing
+        # a band with the new one need a distance check
+        num_bands = min(self.simhash_threshold + 1, self.SIMHASH_BITS)
+        band_width = self.SIMHASH_BITS // num_bands
+        self._simhash_band_layout = [
+            (i * band_width, (1 << (band_width if i < num_bands - 1 else self.SIMHASH_BITS - i * band_width)) - 1)
+            for i in range(num_bands)
+        ]
+        self._simhash_bands = [{} for _ in range(num_bands)]
+        # Seen embeddings, L2 normalized and quantized to int8 with a per-vector scale:
+        # a quarter of the float32 memory, still well within the threshold's precision
+        # seen_embedding_codes/scales are views of the filled rows of preallocated buffers
+        self.seen_embedding_codes = None
+        self.seen_embedding_scales = None
+        self._embedding_buffer = None
+        self._scale_buffer = None
+        self._num_embeddings = 0
+        self.hnsw_index = None
+        
+        # 64-bit fingerprints of raw chunk content already ingested, persisted across runs
+        self.fingerprint_path = config.get('fingerprint_path')
+        self.seen_fingerprints = set()
+        self._new_fingerprints = []
+        # Content filtering runs from concurrent ingest workers
+        self._fingerprint_lock = threading.Lock()
+        # Whether the fingerprint file holds this hash's header, so saves may append to it
+        self._fingerprint_file_valid = False
+        if self.fingerprint_path and os.path.exists(self.fingerprint_path):
+            self._load_fingerprints()
     
     def is_duplicate(self, doc: Dict[str, Any], embedding: List[float] = None) -> bool:
         """
@@ -40,10 +122,12 @@ class Deduplicator:
         Returns:
             bool: True if document is duplicate, False otherwise
         """
-        if self.strategy == 'md5':
-            return self._is_md5_duplicate(doc)
+        if self.strategy in self.EXACT_STRATEGIES:
+            return self._is_hash_duplicate(self._text_bytes(doc))
         elif self.strategy == 'simhash':
             return self._is_simhash_duplicate(doc)
+        elif self.strategy == 'md5+simhash':
+            return self._is_md5_simhash_duplicate(doc, self._text_bytes(doc))
         elif self.strategy == 'embedding':
             if embedding is None:
                 raise ValueError("Embedding required for embedding-based deduplication")
@@ -51,23 +135,226 @@ class Deduplicator:
         else:
             raise ValueError(f"Unknown deduplication strategy: {self.strategy}")
     
-    def _is_md5_duplicate(self, doc: Dict[str, Any]) -> bool:
+    def filter_new(self, docs: List[Dict[str, Any]], embeddings: List[List[float]] = None) -> List[Dict[str, Any]]:
         """
-        Check for MD5 hash duplicate.
+        Filter out duplicate documents in one pass, recording the new ones as seen.
+        
+        Equivalent to calling is_duplicate on each document in order, so duplicates
+        within the batch itself are removed as well.
         
         Args:
-            doc (Dict[str, Any]): Document to check
+            docs (List[Dict[str, Any]]): Documents to check
+            embeddings (List[List[float]], optional): Document embeddings for embedding-based dedup
+            
+        Returns:
+            List[Dict[str, Any]]: Documents that are not duplicates, in input order
+        """
+        if self.strategy in self.EXACT_STRATEGIES:
+            hash_text, seen_hashes = self._exact_hasher()
+            # Hash the whole batch up front, then do the set lookups in one tight loop
+            hashes = [hash_text(self._text_bytes(doc)) for doc in docs]
+            new_docs = []
+            for doc, text_hash in zip(docs, hashes):
+                if text_hash not in seen_hashes:
+                    seen_hashes.add(text_hash)
+                    new_docs.append(doc)
+            return new_docs
+            
+        if embeddings is None:
+            embeddings = [None] * len(docs)
+        return [doc for doc, embedding in zip(docs, embeddings) if not self.is_duplicate(doc, embedding)]
+    
+    def filter_seen_content(self, docs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        Filter out documents whose exact content was already seen, in this or an earlier run.
+        
+        Meant to run before expensive processing such as LLM integration; the configured
+        strategy still runs afterwards on the processed text. Nothing is recorded here: pass
+        the returned fingerprints to commit_fingerprints once the documents are stored, so
+        content whose ingestion fails is not skipped on the next attempt.
+        
+        Args:
+            docs (List[Dict[str, Any]]): Documents to check
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], List[int]]: Documents with unseen content, in input
+                order, and their content fingerprints
+        """
+        fingerprints = [self._fingerprint(doc.get('text', '')) for doc in docs]
+        new_docs = []
+        new_fingerprints = []
+        # Repeats within the batch are dropped as well
+        batch_fingerprints = set()
+        with self._fingerprint_lock:
+            for doc, fingerprint in zip(docs, fingerprints):
+                if fingerprint not in self.seen_fingerprints and fingerprint not in batch_fingerprints:
+                    batch_fingerprints.add(fingerprint)
+                    new_fingerprints.append(fingerprint)
+                    new_docs.append(doc)
+        return new_docs, new_fingerprints
+    
+    def commit_fingerprints(self, fingerprints: List[int]):
+        """
+        Record content fingerprints as ingested, to be persisted by the next save_fingerprints.
+        
+        Call only after the documents they came from are stored; on failure simply drop them.
+        
+        Args:
+            fingerprints (List[int]): Fingerprints returned by filter_seen_content
+        """
+        with self._fingerprint_lock:
+            for fingerprint in fingerprints:
+                if fingerprint not in self.seen_fingerprints:
+                    self.seen_fingerprints.add(fingerprint)
+                    self._new_fingerprints.append(fingerprint)
+    
+    def save_fingerprints(self):
+        """Append fingerprints committed since the last save to the fingerprint file."""
+        if not self.fingerprint_path:
+            return
+        with self._fingerprint_lock:
+            new_fingerprints, self._new_fingerprints = self._new_fingerprints, []
+        if new_fingerprints:
+            # A missing or stale file is replaced, starting with the header of the current hash
+            mode = 'ab' if self._fingerprint_file_valid else 'wb'
+            with open(self.fingerprint_path, mode) as f:
+                if not self._fingerprint_file_valid:
+                    f.write(self._fingerprint_header())
+                np.asarray(new_fingerprints, dtype=np.uint64).tofile(f)
+            self._fingerprint_file_valid = True
+    
+    def _load_fingerprints(self):
+        """Load the fingerprint file, ignoring it if another hash function wrote it."""
+        header = self._fingerprint_header()
+        with open(self.fingerprint_path, 'rb') as f:
+            file_header = f.read(len(header))
+            if file_header != header:
+                logger.warning(
+                    "Ignoring fingerprint file %s written with a different hash function",
+                    self.fingerprint_path
+                )
+                return
+            self.seen_fingerprints.update(np.fromfile(f, dtype=np.uint64).tolist())
+        self._fingerprint_file_valid = True
+    
+    @staticmethod
+    def _fingerprint_header() -> bytes:
+        """
+        Get the fingerprint file header naming the hash function in use.
+        
+        xxhash and the BLAKE2b fallback give different fingerprints, so a file written
+        by one must not be read by the other.
+        
+        Returns:
+            bytes: 8-byte header, keeping the fingerprints after it 8-byte aligned
+        """
+        return b'xxh3_64\0' if XXHASH_AVAILABLE else b'blake2b\0'
+    
+    @staticmethod
+    def _fingerprint(text: str) -> int:
+        """
+        Compute a 64-bit fingerprint of whitespace-normalized text.
+        
+        Args:
+            text (str): Text to fingerprint
+            
+        Returns:
+            int: Unsigned 64-bit fingerprint
+        """
+        data = " ".join(text.split()).encode('utf-8')
+        if XXHASH_AVAILABLE:
+            return xxhash.xxh3_64_intdigest(data)
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+    
+    @staticmethod
+    def _text_bytes(doc: Dict[str, Any]) -> bytes:
+        """
+        Encode a document's text once for the hash functions, which all take bytes.
+        
+        Args:
+            doc (Dict[str, Any]): Document to encode
+            
+        Returns:
+            bytes: UTF-8 encoded text
+        """
+        return doc.get('text', '').encode('utf-8')
+    
+    def _exact_hasher(self) -> Tuple[Callable[[bytes], Hashable], set]:
+        """
+        Get the hash function and seen-digest set of the configured exact strategy.
+        
+        Returns:
+            Tuple[Callable[[bytes], Hashable], set]: Hash function and set of seen digests
+        """
+        if self.strategy == 'md5':
+            return self._blake2b_hash, self.seen_hashes
+        if self.strategy == 'xxh3':
+            return self._xxh3_hash, self.seen_xxh3s
+        return self._sha256_hash, self.seen_sha256s
+    
+    @staticmethod
+    def _blake2b_hash(data: bytes) -> bytes:
+        """
+        Compute a 128-bit BLAKE2b digest of UTF-8 text.
+        
+        Same digest size as MD5, but at least as fast on short texts and faster on long ones.
+        
+        Args:
+            data (bytes): UTF-8 encoded text to hash
+            
+        Returns:
+            bytes: Raw 16-byte BLAKE2b digest
+        """
+        return hashlib.blake2b(data, digest_size=16).digest()
+    
+    @staticmethod
+    def _xxh3_hash(data: bytes) -> int:
+        """
+        Compute the 64-bit XXH3 digest of UTF-8 text.
+        
+        Args:
+            data (bytes): UTF-8 encoded text to hash
+            
+        Returns:
+            int: XXH3 digest
+        """
+        if not XXHASH_AVAILABLE:
+            raise ImportError("xxhash library not available. Install with: pip install xxhash")
+        return xxhash.xxh3_64_intdigest(data)
+    
+    @staticmethod
+    def _sha256_hash(data: bytes) -> bytes:
+        """
+        Compute a 128-bit SHA-256 digest of UTF-8 text.
+        
+        hashlib's SHA-256 uses the CPU's SHA extensions where available, which makes it
+        faster than MD5 on most current hardware.
+        
+        Args:
+            data (bytes): UTF-8 encoded text to hash
+            
+        Returns:
+            bytes: First 16 bytes of the SHA-256 digest
+        """
+        return hashlib.sha256(data).digest()[:16]
+    
+    def _is_hash_duplicate(self, text_bytes: bytes) -> bool:
+        """
+        Check for exact hash duplicate with the configured hash strategy.
+        
+        Args:
+            text_bytes (bytes): UTF-8 encoded text of the document to check
             
         Returns:
             bool: True if document is duplicate, False otherwise
         """
-        text = doc.get('text', '')
-        md5_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
+        hash_text, seen_hashes = self._exact_hasher()
+        text_hash = hash_text(text_bytes)
         
-        if md5_hash in self.seen_md5s:
+        if text_hash in seen_hashes:
             return True
             
-        self.seen_md5s.add(md5_hash)
+        seen_hashes.add(text_hash)
         return False
     
     def _is_simhash_duplicate(self, doc: Dict[str, Any]) -> bool:
@@ -84,16 +371,63 @@ class Deduplicator:
             raise ImportError("Simhash library not available. Install with: pip install simhash")
             
         text = doc.get('text', '')
-        doc_simhash = Simhash(text)
+        doc_simhash = Simhash(text).value
+        band_keys = [(doc_simhash >> shift) & mask for shift, mask in self._simhash_band_layout]
         
-        for seen_simhash in self.seen_simhashes:
-            distance = seen_simhash.distance(doc_simhash)
-            if distance <= self.simhash_threshold:
-                return True
-                
+        # Only fingerprints sharing at least one band can be within the threshold
+        checked = set()
+        for band, key in zip(self._simhash_bands, band_keys):
+            for index in band.get(key, ()):
+                if index in checked:
+                    continue
+                checked.add(index)
+                if _popcount(self.seen_simhashes[index] ^ doc_simhash) <= self.simhash_threshold:
+                    return True
+                    
+        index = len(self.seen_simhashes)
         self.seen_simhashes.append(doc_simhash)
+        for band, key in zip(self._simhash_bands, band_keys):
+            band.setdefault(key, []).append(index)
         return False
     
+    @staticmethod
+    def _quantize(vector: np.ndarray) -> Tuple[np.ndarray, np.float32]:
+        """
+        Quantize a vector to int8 with a symmetric per-vector scale.
+        
+        Args:
+            vector (np.ndarray): Vector to quantize
+            
+        Returns:
+            Tuple[np.ndarray, np.float32]: int8 codes and the scale that maps them back
+        """
+        max_abs = float(np.abs(vector).max()) if vector.size else 0.0
+        scale = np.float32(max_abs / 127 if max_abs else 1.0)
+        return np.round(vector / scale).astype(np.int8), scale
+    
+    def _is_md5_simhash_duplicate(self, doc: Dict[str, Any], text_bytes: bytes) -> bool:
+        """
+        Check for exact hash duplicate first, then for SimHash approximate duplicate.
+        
+        Exact repeats are answered by one set lookup and skip the much more expensive
+        SimHash computation and scan.
+        
+        Args:
+            doc (Dict[str, Any]): Document to check
+            text_bytes (bytes): UTF-8 encoded text of the document
+            
+        Returns:
+            bool: True if document is duplicate, False otherwise
+        """
+        text_hash = self._blake2b_hash(text_bytes)
+        if text_hash in self.seen_hashes:
+            return True
+            
+        is_duplicate = self._is_simhash_duplicate(doc)
+        # Any later exact repeat is a duplicate either way, so near duplicates are recorded too
+        self.seen_hashes.add(text_hash)
+        return is_duplicate
+    
     def _is_embedding_duplicate(self, embedding: List[float]) -> bool:
         """
         Check for embedding-based duplicate using cosine similarity.
@@ -104,24 +438,143 @@ class Deduplicator:
         Returns:
             bool: True if document is duplicate, False otherwise
         """
-        if not self.seen_embeddings:
-            self.seen_embeddings.append(embedding)
-            return False
+        # Normalize only the new vector, seen vectors are stored normalized
+        query = np.array(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query /= norm
+            
+        if self.embedding_index == 'auto':
+            # Without FAISS the scan simply continues, 'auto' never requires it
+            if self.hnsw_index is None and FAISS_AVAILABLE and self._num_embeddings >= self.hnsw_min_vectors:
+                self._move_embeddings_to_hnsw()
+            if self.hnsw_index is not None:
+                return self._is_hnsw_duplicate(query)
+        elif self.embedding_index == 'hnsw':
+            return self._is_hnsw_duplicate(query)
+        elif self.embedding_index != 'flat':
+            raise ValueError(f"Unknown embedding index: {self.embedding_index}")
+            
+        if self.seen_embedding_codes is not None:
+            codes, scales = self.seen_embedding_codes, self.seen_embedding_scales
+            block = max(1, self.EMBEDDING_SCAN_BLOCK_BYTES // query.shape[0])
+            for start in range(0, len(codes), block):
+                # Cosine similarities against the dequantized seen vectors
+                similarities = (codes[start:start + block] @ query) * scales[start:start + block]
+                
+                # Check if any similarity exceeds threshold, skipping the remaining blocks
+                if np.any(similarities >= self.embedding_threshold):
+                    return True
+                    
+        self._add_embedding(*self._quantize(query))
+        return False
+    
+    def _add_embedding(self, codes: np.ndarray, scale: np.float32):
+        """
+        Append a quantized embedding to the seen buffers, doubling their capacity when full.
+        
+        Args:
+            codes (np.ndarray): int8 codes of the normalized embedding
+            scale (np.float32): Quantization scale of the embedding
+        """
+        n = self._num_embeddings
+        if self._embedding_buffer is None:
+            self._embedding_buffer = self._code_buffer(self.INITIAL_EMBEDDING_CAPACITY, codes.shape[0])
+            self._scale_buffer = np.empty(self.INITIAL_EMBEDDING_CAPACITY, dtype=np.float32)
+        elif n == len(self._embedding_buffer):
+            # Geometric growth keeps appends amortized O(D) instead of copying every row each time
+            self._embedding_buffer = self._code_buffer(2 * n, codes.shape[0])
+            self._scale_buffer = np.concatenate([self._scale_buffer, np.empty_like(self._scale_buffer)])
             
-        # Convert to numpy arrays
-        emb_array = np.array(embedding)
-        seen_arrays = np.array(self.seen_embeddings)
+        self._embedding_buffer[n] = codes
+        self._scale_buffer[n] = scale
+        self._num_embeddings = n + 1
+        self.seen_embedding_codes = self._embedding_buffer[:n + 1]
+        self.seen_embedding_scales = self._scale_buffer[:n + 1]
+    
+    def _code_buffer(self, capacity: int, dim: int) -> np.ndarray:
+        """
+        Allocate the int8 code buffer with the given capacity, keeping the rows stored so far.
         
-        # Normalize vectors
-        emb_norm = emb_array / np.linalg.norm(emb_array)
-        seen_norms = seen_arrays / np.linalg.norm(seen_arrays, axis=1, keepdims=True)
+        Args:
+            capacity (int): Number of rows
+            dim (int): Embedding dimension
+            
+        Returns:
+            np.ndarray: Code buffer, a np.memmap when embedding_scratch_dir is set
+        """
+        if self.embedding_scratch_dir:
+            if self._embedding_file is None:
+                self._embedding_file = tempfile.NamedTemporaryFile(
+                    dir=self.embedding_scratch_dir, prefix='dedup_embeddings_', suffix='.bin'
+                )
+            # Remapping with a larger shape extends the file in place, so stored rows are
+            # never copied; writes land in the page cache and are not synced per insert
+            return np.memmap(self._embedding_file, dtype=np.int8, mode='r+', shape=(capacity, dim))
+            
+        buffer = np.empty((capacity, dim), dtype=np.int8)
+        if self._embedding_buffer is not None:
+            buffer[:len(self._embedding_buffer)] = self._embedding_buffer
+        return buffer
+    
+    def _is_hnsw_duplicate(self, query: np.ndarray) -> bool:
+        """
+        Check for embedding-based duplicate with an approximate HNSW nearest neighbour search.
         
-        # Calculate cosine similarities
-        similarities = np.dot(seen_norms, emb_norm)
+        Vectors are unit length, so the inner product metric gives cosine similarity.
         
-        # Check if any similarity exceeds threshold
-        if np.any(similarities >= self.embedding_threshold):
-            return True
+        Args:
+            query (np.ndarray): L2 normalized float32 document embedding
             
-        self.seen_embeddings.append(embedding)
-        return False
\ No newline at end of file
+        Returns:
+            bool: True if document is duplicate, False otherwise
+        """
+        if not FAISS_AVAILABLE:
+            raise ImportError("FAISS library not available. Install with: pip install faiss-cpu")
+            
+        if self.hnsw_index is None:
+            self.hnsw_index = self._new_hnsw_index(query.shape[0])
+            
+        query = query.reshape(1, -1)
+        if self.hnsw_index.ntotal:
+            similarities, _ = self.hnsw_index.search(query, 1)
+            if similarities[0, 0] >= self.embedding_threshold:
+                return True
+                
+        self.hnsw_index.add(query)
+        return False
+    
+    def _new_hnsw_index(self, dim: int) -> 'faiss.IndexHNSWFlat':
+        """
+        Create an empty inner product HNSW index with the configured graph parameters.
+        
+        Args:
+            dim (int): Embedding dimension
+            
+        Returns:
+            faiss.IndexHNSWFlat: Empty HNSW index
+        """
+        index = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = self.hnsw_ef_search
+        return index
+    
+    def _move_embeddings_to_hnsw(self):
+        """
+        Build an HNSW index from the scanned embeddings and release the flat store.
+        
+        Past this point each flat lookup costs O(N) and dedup as a whole O(N^2), while
+        HNSW lookups stay logarithmic.
+        """
+        vectors = self.seen_embedding_codes * self.seen_embedding_scales[:, np.newaxis]
+        self.hnsw_index = self._new_hnsw_index(vectors.shape[1])
+        self.hnsw_index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        
+        self.seen_embedding_codes = None
+        self.seen_embedding_scales = None
+        self._embedding_buffer = None
+        self._scale_buffer = None
+        self._num_embeddings = 0
+        # Closing the scratch file deletes it
+        if self._embedding_file is not None:
+            self._embedding_file.close()
+            self._embedding_file = None
@@ -1,40 +1,71 @@
-import yaml
 import os
-import json
-from typing import List, Dict, Any
-from openai import OpenAI
+import asyncio
+import logging
+import threading
+import yaml
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import orjson
+from typing import List, Dict, Any, Awaitable, TypeVar
+from openai import AsyncOpenAI, APIConnectionError, InternalServerError, RateLimitError
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 from jinja2 import Environment, FileSystemLoader
+from utils.config import load_config
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-# Load configuration
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
-
 # Load prompt templates
 prompt_template_path = os.path.join(os.path.dirname(__file__), '..', 'prompts')
 template_env = Environment(loader=FileSystemLoader(prompt_template_path))
 
+T = TypeVar('T')
+
+def _run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code.
+    
+    asyncio.run cannot start inside a running event loop, e.g. when called from an async
+    handler or a notebook, so in that case the coroutine gets its own loop in a thread.
+    
+    Args:
+        coro (Awaitable[T]): Coroutine to run
+        
+    Returns:
+        T: Result of the coroutine
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+# Transient API errors worth another attempt; APIConnectionError covers timeouts
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+# Stands in for the chunk content while the rest of the user prompt is rendered
+_CONTENT_SLOT = '\x00content\x00'
+
 class LLMProcessor:
     """LLM Processor for knowledge integration"""
     
     def __init__(self):
         """Initialize LLM processor with configuration."""
-        llm_config = config.get('llm', {})
-        
-        self.client = OpenAI(
-            api_key=llm_config.get('api_key', ''),
-            base_url=llm_config.get('base_url', 'https://api.openai.com/v1'),
-        )
+        llm_config = load_config().get('llm', {})
         
+        self.api_key = llm_config.get('api_key', '')
+        self.base_url = llm_config.get('base_url', 'https://api.openai.com/v1')
         self.model_name = llm_config.get('model_name', 'gpt-4o-mini')
         self.timeout = llm_config.get('timeout', 30)
         self.max_retries = llm_config.get('max_retries', 3)
-        
-        # Load prompt template
-        self.template = template_env.get_template('knowledge_integration.yaml')
+        # Maximum number of LLM requests in flight at once, across every thread and event
+        # loop using this processor; ingest workers each run their own loop
+        self.concurrency = llm_config.get('concurrency', 20)
+        self._request_slots = threading.BoundedSemaphore(self.concurrency)
+        # Threads that wait for a slot, kept off the loops' default executors so waiting
+        # requests never stall other to_thread or run_in_executor users
+        self._slot_waiters = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='llm-slot')
         
         # 定义类型列表
         self.types = [
@@ -47,9 +78,78 @@ class LLMProcessor:
             '政策解读',
             '交易策略与纪律',
         ]
+        # The list keeps the order shown in the prompt, the set answers validation lookups
+        self._types_set = frozenset(self.types)
+        
+        # Load prompt template
+        with open(os.path.join(prompt_template_path, 'knowledge_integration.yaml'), 'r', encoding='utf-8') as f:
+            prompts = yaml.safe_load(f)['knowledge_integration']
+        self.system_prompt = prompts['system_prompt']
+        
+        # Only the content changes between chunks, so render everything else once
+        user_prompt = template_env.from_string(prompts['user_prompt']).render(content=_CONTENT_SLOT, types=self.types)
+        self._user_prompt_head, self._user_prompt_tail = user_prompt.split(_CONTENT_SLOT)
         
         logger.info("LLM Processor initialized")
     
+    def _create_client(self) -> AsyncOpenAI:
+        """
+        Create an async client for one event loop.
+        
+        The client's connection pool is bound to the loop it first runs on, so each
+        asyncio.run gets its own client. The client's own retries are disabled, see
+        _retrying.
+        
+        Returns:
+            AsyncOpenAI: Async OpenAI-compatible client
+        """
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            max_retries=0,
+        )
+    
+    def _retrying(self) -> AsyncRetrying:
+        """
+        Create the retry policy for one LLM request.
+        
+        Transient errors are retried up to max_retries times with jittered exponential
+        backoff, so concurrent requests hitting a rate limit do not retry in lockstep.
+        The backoff awaits asyncio.sleep and never blocks the other requests on the loop.
+        A fresh policy per request keeps the retry state of concurrent requests apart.
+        
+        Returns:
+            AsyncRetrying: Retry policy that re-raises the last error when attempts run out
+        """
+        return AsyncRetrying(
+            retry=retry_if_exception_type(RETRYABLE_ERRORS),
+            wait=wait_exponential_jitter(initial=1, max=10),
+            stop=stop_after_attempt(self.max_retries + 1),
+            reraise=True,
+        )
+    
+    @asynccontextmanager
+    async def _request_slot(self):
+        """
+        Hold one of the processor-wide request slots for the duration of the block.
+        
+        The slots are a threading semaphore, since an asyncio one only limits its own loop.
+        A request that has to wait blocks one of the processor's waiter threads instead of
+        the event loop.
+        """
+        if not self._request_slots.acquire(blocking=False):
+            waiter = asyncio.get_running_loop().run_in_executor(self._slot_waiters, self._request_slots.acquire)
+            try:
+                await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                # The thread still takes the slot once one is free, so hand it straight back
+                waiter.add_done_callback(lambda _: self._request_slots.release())
+                raise
+        try:
+            yield
+        finally:
+            self._request_slots.release()
+    
     def integrate_knowledge(self, content: str, source: str = "") -> Dict[str, Any]:
         """
         Integrate knowledge using LLM.
@@ -58,31 +158,52 @@ class LLMProcessor:
             content (str): Content to be integrated
             source (str): Source of the content
             
+        Returns:
+            Dict[str, Any]: Integrated knowledge in structured format
+        """
+        async def run():
+            async with self._create_client() as client:
+                return await self._integrate_async(client, content, source)
+        
+        return _run_sync(run())
+    
+    async def _integrate_async(self, client: AsyncOpenAI, content: str, source: str = "") -> Dict[str, Any]:
+        """
+        Integrate knowledge using LLM without blocking the event loop.
+        
+        Args:
+            client (AsyncOpenAI): Client created for the running loop
+            content (str): Content to be integrated
+            source (str): Source of the content
+            
         Returns:
             Dict[str, Any]: Integrated knowledge in structured format
         """
         try:
             # Prepare prompt
-            system_prompt = self.template.module.system_prompt
-            user_prompt = self.template.render(content=content, types=self.types)
+            user_prompt = self._user_prompt_head + content + self._user_prompt_tail
             
             # Call LLM API
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,
-                max_tokens=2048,
-                timeout=self.timeout
-            )
+            # The slot is kept through retry backoff, so rate limited requests do not make
+            # room for even more requests
+            async with self._request_slot():
+                response = await self._retrying()(
+                    client.chat.completions.create,
+                    model=self.model_name,
+                    messages=[
+                        {"role": "system", "content": self.system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.1,
+                    max_tokens=2048,
+                    timeout=self.timeout
+                )
             
             # Parse response
-            result_str = response.choices[0].message.content.strip()
+            result_str = response.choices[0].message.content
             
-            # 解析JSON结果
-            result = json.loads(result_str)
+            # 解析JSON结果（JSON 允许首尾空白，无需先 strip）
+            result = orjson.loads(result_str)
             
             # 验证必要字段
             required_fields = ['content', 'type', 'timestamp', 'source']
@@ -91,17 +212,20 @@ class LLMProcessor:
                     raise ValueError(f"Missing required field: {field}")
             
             # 验证类型是否在允许的范围内
-            if result['type'] not in self.types:
+            if result['type'] not in self._types_set:
                 raise ValueError(f"Invalid type: {result['type']}")
             
-            logger.info(f"Knowledge integrated successfully")
+            logger.info("Knowledge integrated successfully: %s", source)
             return result
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse LLM response as JSON: {str(e)}")
+        except orjson.JSONDecodeError as e:
+            logger.error("Failed to parse LLM response as JSON: %s", e)
+            # Slice the preview only when DEBUG output is actually wanted
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Unparsable LLM response: %s", result_str[:200])
             raise
         except Exception as e:
-            logger.error(f"Failed to integrate knowledge: {str(e)}")
+            logger.error("Failed to integrate knowledge: %s", e)
             raise
     
     def process_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -114,29 +238,53 @@ class LLMProcessor:
         Returns:
             List[Dict[str, Any]]: Processed chunks
         """
+        return _run_sync(self.aprocess_chunks(chunks))
+    
+    async def aprocess_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Process chunks using LLM integration, with up to concurrency requests in flight
+        across all callers of this processor.
+        
+        Args:
+            chunks (List[Dict[str, Any]]): Chunks to be processed
+            
+        Returns:
+            List[Dict[str, Any]]: Processed chunks, in input order
+        """
+        if not chunks:
+            return []
+        
+        # Bounds the requests this loop starts at once; the processor-wide slots only
+        # limit requests across loops
+        loop_slots = asyncio.Semaphore(self.concurrency)
+        
+        async def integrate(client: AsyncOpenAI, chunk: Dict[str, Any]) -> Dict[str, Any]:
+            async with loop_slots:
+                return await self._integrate_async(client, chunk.get('text', ''), chunk.get('source', ''))
+        
+        async with self._create_client() as client:
+            # 使用大模型整合知识
+            results = await asyncio.gather(
+                *(integrate(client, chunk) for chunk in chunks),
+                return_exceptions=True,
+            )
+        
         processed_chunks = []
         
-        for chunk in chunks:
-            try:
-                # 获取原始内容和来源
-                content = chunk.get('text', '')
-                source = chunk.get('source', '')
-                
-                # 使用大模型整合知识
-                integrated_result = self.integrate_knowledge(content, source)
-                
-                # 更新chunk信息
-                processed_chunk = chunk.copy()
-                processed_chunk['text'] = integrated_result['content']
-                processed_chunk['domain'] = integrated_result['type']
-                processed_chunk['timestamp'] = integrated_result['timestamp']
-                processed_chunk['source'] = integrated_result['source']
-                
-                processed_chunks.append(processed_chunk)
-                
-            except Exception as e:
-                logger.warning(f"Failed to process chunk: {str(e)}. Using original chunk.")
+        for chunk, integrated_result in zip(chunks, results):
+            if isinstance(integrated_result, Exception):
+                logger.warning("Failed to process chunk: %s. Using original chunk.", integrated_result)
                 # 出错时使用原始chunk
                 processed_chunks.append(chunk)
+                continue
+            
+            # 更新chunk信息，一次合并生成新chunk
+            processed_chunks.append({
+                **chunk,
+                'text': integrated_result['content'],
+                'domain': integrated_result['type'],
+                'timestamp': integrated_result['timestamp'],
+                'source': integrated_result['source'],
+            })
         
-        return processed_chunks
\ No newline at end of file
+        return processed_chunks
@@ -1,11 +1,5 @@
 import logging
-import yaml
-import os
-
-# Load configuration
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
+from utils.config import load_config
 
 def get_logger(name: str) -> logging.Logger:
     """
@@ -17,6 +11,7 @@ def get_logger(name: str) -> logging.Logger:
     Returns:
         logging.Logger: Configured logger instance
     """
+    config = load_config()
     logger = logging.getLogger(name)
     logger.setLevel(config['logging']['level'])
     
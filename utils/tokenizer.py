@@ -1,10 +1,51 @@
-from typing import List
+import re
+from functools import lru_cache
+from itertools import accumulate
+from typing import List, Tuple
 
 try:
-    import jieba
+    # jieba_fast is a drop-in jieba with the segmentation hot loops in C
+    import jieba_fast as jieba
     JIEBA_AVAILABLE = True
 except ImportError:
-    JIEBA_AVAILABLE = False
+    try:
+        import jieba
+        JIEBA_AVAILABLE = True
+    except ImportError:
+        JIEBA_AVAILABLE = False
+
+if JIEBA_AVAILABLE:
+    # Load the dictionary now rather than stalling the first tokenize call
+    jieba.initialize()
+
+# Tokens of the whitespace fallback tokenizer
+_NON_SPACE_RE = re.compile(r'\S+')
+
+# Queries and separators are short and tokenized over and over, so only texts up to this
+# length are cached; chunks and other long texts bypass the caches. Each cache thus holds
+# at most 4096 texts of this length, plus their tokens
+_CACHE_MAX_CHARS = 256
+
+def _segment(text: str) -> Tuple[str, ...]:
+    if JIEBA_AVAILABLE:
+        return tuple(jieba.cut(text))
+    # Fallback to simple split if jieba is not available
+    return tuple(text.split())
+
+def _count_segments(text: str) -> int:
+    if JIEBA_AVAILABLE:
+        # Count while segmenting instead of building the token list
+        return sum(1 for _ in jieba.cut(text))
+    return len(text.split())
+
+_segment_cached = lru_cache(maxsize=4096)(_segment)
+_count_segments_cached = lru_cache(maxsize=4096)(_count_segments)
+
+def _tokenize(text: str) -> Tuple[str, ...]:
+    return _segment_cached(text) if len(text) <= _CACHE_MAX_CHARS else _segment(text)
+
+def _count_tokens(text: str) -> int:
+    return _count_segments_cached(text) if len(text) <= _CACHE_MAX_CHARS else _count_segments(text)
 
 class Tokenizer:
     """Simple tokenizer wrapper for text processing."""
@@ -20,11 +61,32 @@ class Tokenizer:
         Returns:
             List[str]: List of tokens
         """
+        # A fresh list per call, callers may modify it without touching the cache
+        return list(_tokenize(text))
+    
+    @staticmethod
+    def token_offsets(text: str) -> Tuple[List[int], List[int]]:
+        """
+        Tokenize text into the character offsets of its tokens.
+        
+        Slicing the text with these offsets recovers the tokens without copying them first,
+        and a slice spanning several tokens keeps the original characters between them.
+        
+        Args:
+            text (str): Input text to tokenize
+            
+        Returns:
+            Tuple[List[int], List[int]]: Start and end character offset of every token
+        """
         if JIEBA_AVAILABLE:
-            return list(jieba.cut(text))
+            # jieba keeps every character of the input, so tokens are contiguous
+            ends = list(accumulate(map(len, jieba.cut(text))))
+            if not ends:
+                return [], []
+            return [0, *ends[:-1]], ends
         else:
-            # Fallback to simple split if jieba is not available
-            return text.split()
+            spans = [match.span() for match in _NON_SPACE_RE.finditer(text)]
+            return [start for start, _ in spans], [end for _, end in spans]
     
     @staticmethod
     def count_tokens(text: str) -> int:
@@ -37,4 +99,4 @@ class Tokenizer:
         Returns:
             int: Number of tokens
         """
-        return len(Tokenizer.tokenize(text))
\ No newline at end of file
+        return _count_tokens(text)
\ No newline at end of file